@@ -0,0 +1,39 @@
+// Live dashboard: when the server pushes an appointment change, re-fetch this page once and swap in
+// the sections marked data-live, instead of reloading the whole dashboard on a timer.
+(function () {
+    var config = document.getElementById('live-dashboard');
+    if (!config || !window.EventSource) {
+        return;
+    }
+
+    var pending = null;
+
+    function refresh() {
+        pending = null;
+        fetch(window.location.href, { credentials: 'same-origin' })
+            .then(function (response) {
+                return response.ok ? response.text() : Promise.reject(response.status);
+            })
+            .then(function (html) {
+                var fresh = new DOMParser().parseFromString(html, 'text/html');
+                document.querySelectorAll('[data-live]').forEach(function (section) {
+                    var replacement = fresh.getElementById(section.id);
+                    if (replacement) {
+                        section.innerHTML = replacement.innerHTML;
+                    }
+                });
+            })
+            .catch(function () {});  // The next event will try again
+    }
+
+    function schedule() {
+        // A burst of changes (e.g. a booked series) costs one fetch
+        if (!pending) {
+            pending = setTimeout(refresh, 500);
+        }
+    }
+
+    var source = new EventSource(config.dataset.eventsUrl);
+    source.addEventListener('appointment', schedule);
+    source.addEventListener('resync', schedule);
+})();
@@ -60,7 +60,10 @@ document.addEventListener('DOMContentLoaded', function () {
                     form.submit();  // Proceed with form submission if valid
                 } else {
                     // Display appropriate error messages
-                    if (response.error_type === "user_not_found") {
+                    if (response.error_type === "rate_limited") {
+                        usernameError.textContent = 'Too many attempts. Please wait a moment and try again.';
+                        usernameError.style.display = 'block'; // Show the error
+                    } else if (response.error_type === "user_not_found") {
                         usernameError.textContent = 'This email or username is not registered.';
                         usernameError.style.display = 'block'; // Show the error
                     } else if (response.error_type === "invalid_password") {
@@ -87,6 +90,10 @@ document.addEventListener('DOMContentLoaded', function () {
 
         return fetch(url)
             .then(response => {
+                // The server rate-limits these checks; a 429 still carries a JSON error_type
+                if (response.status === 429) {
+                    return response.json();
+                }
                 if (!response.ok) {
                     throw new Error(`HTTP error! Status: ${response.status}`);
                 }
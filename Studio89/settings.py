@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'pages.logs.RequestIDMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,10 +66,17 @@ ROOT_URLCONF = 'Studio89.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times renders for the request profiler (pages/profiling.py)
+        'BACKEND': 'pages.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process (the dev autoreloader still resets it on edits)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -87,21 +95,86 @@ WSGI_APPLICATION = 'Studio89.wsgi.application'
 
 
 # Database configuration
-DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{BASE_DIR}/db.sqlite3')
+DATABASE_URL = os.getenv('DATABASE_URL') or f'sqlite:///{BASE_DIR}/db.sqlite3'  # Empty (as in .env.example) means SQLite
 if DATABASE_URL.startswith('sqlite'):
+    # Tuned for several workers on one file: WAL lets readers run alongside the writer, and writing
+    # transactions start with BEGIN IMMEDIATE so they queue on the busy timeout instead of failing
+    # with "database is locked" when they upgrade from reading to writing. Every atomic() block then
+    # holds the write lock for its whole length, so none may wait on the network: the email outbox
+    # leases rows and sends outside its transactions, and Stripe is only called outside atomic()
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # Durable at checkpoints; safe with WAL
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes; 0 disables
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 20))  # Seconds to wait for the write lock
+    SQLITE_TRANSACTION_MODE = os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Run on every new connection
+                'init_command': (
+                    f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE};"
+                    f"PRAGMA synchronous={SQLITE_SYNCHRONOUS};"
+                    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}"
+                ),
+                'timeout': SQLITE_BUSY_TIMEOUT,
+                'transaction_mode': SQLITE_TRANSACTION_MODE or None,
+            },
+            # On a file rather than in memory, so tests can open a connection per thread
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 else:
-    # Example for PostgreSQL, extend as needed
+    # PostgreSQL: keep connections between requests (health-checked before reuse), or hand them out from a
+    # psycopg pool with DB_POOL=True (needs `pip install "psycopg[pool]"`). Pooling replaces persistent
+    # connections, and is the one to use under ASGI, where persistent connections are not reused.
     import dj_database_url
+    DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('true', '1', 'yes')
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(
+            DATABASE_URL,
+            conn_max_age=0 if DB_POOL else int(os.getenv('CONN_MAX_AGE', 600)),
+            conn_health_checks=os.getenv('CONN_HEALTH_CHECKS', 'True').lower() in ('true', '1', 'yes'),
+        )
+    }
+    if DB_POOL:
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # Seconds to wait for a free connection
+        }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'studio89',
+        }
+    }
+else:
+    # Per-process memory cache; fine for development and single-process deployments
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'studio89',
+        }
     }
 
+# Full-page cache for the static marketing and outlet pages (anonymous visitors only)
+PAGE_CACHE_ALIAS = os.getenv('PAGE_CACHE_ALIAS', 'default')
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+OUTLET_PAGE_CACHE_TIMEOUT = int(os.getenv('OUTLET_PAGE_CACHE_TIMEOUT', 60))  # Outlet pages show live availability
+PAGE_CACHE_MAX_AGE = int(os.getenv('PAGE_CACHE_MAX_AGE', 300))  # Browser/proxy Cache-Control max-age
+# Set to the deployed git SHA to bust cached pages on deploy; defaults to a digest of template/static mtimes
+RELEASE_VERSION = os.getenv('RELEASE_VERSION', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -151,16 +224,139 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'pages.CustomUser'
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',  # Default backend
-    'pages.authentication.EmailOrUsernameBackend',  # Custom backend for username or email
+    'pages.authentication.EmailOrUsernameBackend',  # Username or email, one lookup and one hash per login
+    'django.contrib.auth.backends.ModelBackend',  # Kept so sessions created with it stay valid
 ]
 
 LOGIN_URL = '/login'
 
 
 # Email backend configuration for Mailgun
-EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django_mailgun_mime.backends.MailgunMIMEBackend')
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'pages.mailgun.MailgunEmailBackend')
 MAILGUN_API_KEY = os.getenv('MAILGUN_API_KEY', '')
 MAILGUN_DOMAIN_NAME = os.getenv('MAILGUN_DOMAIN_NAME', '')
+# Point at `python manage.py mailgun_stub` (e.g. http://127.0.0.1:8025/v3) to run without Mailgun
+MAILGUN_API_URL = os.getenv('MAILGUN_API_URL', 'https://api.mailgun.net/v3')
+MAILGUN_CONNECT_TIMEOUT = float(os.getenv('MAILGUN_CONNECT_TIMEOUT', 3.05))
+MAILGUN_READ_TIMEOUT = float(os.getenv('MAILGUN_READ_TIMEOUT', 10))
+MAILGUN_POOL_SIZE = int(os.getenv('MAILGUN_POOL_SIZE', 10))
+MAILGUN_BREAKER_THRESHOLD = int(os.getenv('MAILGUN_BREAKER_THRESHOLD', 5))
+MAILGUN_BREAKER_RESET_SECONDS = int(os.getenv('MAILGUN_BREAKER_RESET_SECONDS', 30))
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', '')
-SERVER_EMAIL = os.getenv('SERVER_EMAIL', '')
\ No newline at end of file
+SERVER_EMAIL = os.getenv('SERVER_EMAIL', '')
+
+# Stripe (PaymentIntents, confirmed by the webhook at /Payment/webhook/)
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
+STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', '')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+# Point at `python manage.py stripe_stub` (e.g. http://127.0.0.1:12111) to run without Stripe
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', '')
+
+# Free-slot availability cache (entries are also invalidated on appointment save/delete)
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv('AVAILABILITY_CACHE_TIMEOUT', 60 * 60 * 24))
+AVAILABILITY_MAX_DAYS = int(os.getenv('AVAILABILITY_MAX_DAYS', 31))
+
+# Compiled specialist schedules (working hours, breaks, exceptions) as per-day bitmaps
+SCHEDULE_SLOT_MINUTES = int(os.getenv('SCHEDULE_SLOT_MINUTES', 5))
+SCHEDULE_CACHE_TIMEOUT = int(os.getenv('SCHEDULE_CACHE_TIMEOUT', 60 * 60 * 24))
+SCHEDULE_EXCEPTION_HISTORY_DAYS = int(os.getenv('SCHEDULE_EXCEPTION_HISTORY_DAYS', 31))
+
+# Outbound email queue (delivered by `python manage.py send_queued_email`)
+EMAIL_QUEUE_BATCH_SIZE = int(os.getenv('EMAIL_QUEUE_BATCH_SIZE', 50))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv('EMAIL_QUEUE_MAX_ATTEMPTS', 5))
+EMAIL_QUEUE_BACKOFF_SECONDS = int(os.getenv('EMAIL_QUEUE_BACKOFF_SECONDS', 60))
+# How long a worker owns the rows it took before another may retry them; must outlast a batch of sends
+EMAIL_QUEUE_LEASE_SECONDS = int(os.getenv('EMAIL_QUEUE_LEASE_SECONDS', 60 * 15))
+
+# Rows fetched per round trip by the streaming exports and written per batch by `import_data`
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+# Upper bound on the sessions one recurring series can book
+SERIES_MAX_OCCURRENCES = int(os.getenv('SERIES_MAX_OCCURRENCES', 52))
+
+# Unpaid (PENDING) bookings hold their slot this long; `python manage.py expire_holds` reaps them
+APPOINTMENT_HOLD_SECONDS = int(os.getenv('APPOINTMENT_HOLD_SECONDS', 15 * 60))
+# Once one session of a series is paid, its unpaid sessions are held this long (renewed by each payment)
+SERIES_HOLD_SECONDS = int(os.getenv('SERIES_HOLD_SECONDS', 24 * 60 * 60))
+APPOINTMENT_HOLD_BATCH_SIZE = int(os.getenv('APPOINTMENT_HOLD_BATCH_SIZE', 1000))
+# Expired holds older than this many days are deleted by the reaper (0 keeps them)
+APPOINTMENT_HOLD_PURGE_DAYS = int(os.getenv('APPOINTMENT_HOLD_PURGE_DAYS', 30))
+
+# Appointments per page in the specialist and staff listings (keyset paginated)
+APPOINTMENTS_PAGE_SIZE = int(os.getenv('APPOINTMENTS_PAGE_SIZE', 25))
+
+# Live dashboard updates (Server-Sent Events at /Dashboard/events/, served by the ASGI app).
+# LocalBroker only reaches clients of the same process; use pages.events.RedisBroker with several workers
+EVENTS_BROKER = os.getenv('EVENTS_BROKER', 'pages.events.LocalBroker')
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+EVENTS_RETRY_MILLISECONDS = int(os.getenv('EVENTS_RETRY_MILLISECONDS', 5000))
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+
+# Read-only REST API (/api/): JSON only; its paginators use the listings' page size (pages/pagination.py)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+# Login probe endpoints (check_user_exists*): token buckets per client IP and per identifier
+RATELIMIT_CACHE_ALIAS = os.getenv('RATELIMIT_CACHE_ALIAS', 'default')
+# Reverse proxies in front of the app that append to X-Forwarded-For (0: use REMOTE_ADDR)
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+USER_PROBE_RATE = float(os.getenv('USER_PROBE_RATE', 2))  # Tokens refilled per second
+USER_PROBE_BURST = int(os.getenv('USER_PROBE_BURST', 20))
+PASSWORD_PROBE_RATE = float(os.getenv('PASSWORD_PROBE_RATE', 0.2))
+PASSWORD_PROBE_BURST = int(os.getenv('PASSWORD_PROBE_BURST', 5))
+USER_EXISTS_CACHE_TIMEOUT = int(os.getenv('USER_EXISTS_CACHE_TIMEOUT', 30))
+PASSWORD_PROBE_DEBOUNCE_SECONDS = int(os.getenv('PASSWORD_PROBE_DEBOUNCE_SECONDS', 5))
+
+# Outlet pages: active specialists with their next free slot
+OUTLET_SPECIALISTS_CACHE_TIMEOUT = int(os.getenv('OUTLET_SPECIALISTS_CACHE_TIMEOUT', 60))
+OUTLET_SLOT_MINUTES = int(os.getenv('OUTLET_SLOT_MINUTES', 30))  # Shortest bookable appointment
+OUTLET_HORIZON_DAYS = int(os.getenv('OUTLET_HORIZON_DAYS', 14))
+
+# Request profiling (pages/profiling.py): off unless PROFILING_ENABLED. A PROFILING_SAMPLE_RATE fraction
+# of requests get query, template and external-call timings; slow ones are kept for the admin.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() in ('true', '1', 'yes')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_SLOW_REQUEST_MS = float(os.getenv('PROFILING_SLOW_REQUEST_MS', 1000))
+PROFILING_SLOW_LOG_SIZE = int(os.getenv('PROFILING_SLOW_LOG_SIZE', 500))
+# Server-Timing headers on sampled responses for everyone (staff always get them)
+PROFILING_SERVER_TIMING = os.getenv('PROFILING_SERVER_TIMING', str(DEBUG)).lower() in ('true', '1', 'yes')
+if PROFILING_ENABLED:
+    # Just inside the request ID middleware, so it sees the whole request and its log lines carry the ID
+    MIDDLEWARE.insert(1, 'pages.profiling.RequestProfilingMiddleware')
+
+# Logging: JSON lines (or plain text for development) on stderr, each with the request's ID.
+# Records are formatted by the caller and written by a background thread (pages.logs.BackgroundHandler).
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text' if DEBUG else 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'pages.logs.RequestIDFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'pages.logs.JSONFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'},
+    },
+    'handlers': {
+        'background': {
+            'class': 'pages.logs.BackgroundHandler',
+            'queue_size': LOG_QUEUE_SIZE,
+            'filters': ['request_id'],
+            'formatter': LOG_FORMAT,
+        },
+    },
+    'root': {'handlers': ['background'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['background'], 'level': LOG_LEVEL, 'propagate': False},
+        'pages': {'handlers': ['background'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
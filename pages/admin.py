@@ -37,7 +37,7 @@ class CustomUserAdmin(UserAdmin):
 # Appointment Admin to restrict access based on logged-in user's specialty
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
-    list_display = ('specialist', 'date', 'time')
+    list_display = ('specialist', 'date', 'time', 'room')
     search_fields = ('specialist__name', 'date', 'time')
     list_filter = ('date', 'specialist')
 
@@ -71,11 +71,27 @@ class AppointmentAdmin(admin.ModelAdmin):
         return False
 
 
+from .models import ScheduleBreak, ScheduleException, WorkingHours
+
+class WorkingHoursInline(admin.TabularInline):
+    model = WorkingHours
+    extra = 0
+
+class ScheduleBreakInline(admin.TabularInline):
+    model = ScheduleBreak
+    extra = 0
+
+class ScheduleExceptionInline(admin.TabularInline):
+    model = ScheduleException
+    extra = 0
+
 # Registering Specialist model in Django admin
 @admin.register(Specialist)
 class SpecialistAdmin(admin.ModelAdmin):
-    list_display = ('name', 'specialty', 'email', 'availability_start', 'availability_end', 'is_active')
+    list_display = ('name', 'specialty', 'email', 'availability_start', 'availability_end', 'is_active', 'room_type')
     search_fields = ('name', 'specialty', 'email')
+    # Without working hours rows, availability_start/availability_end apply every day
+    inlines = [WorkingHoursInline, ScheduleBreakInline, ScheduleExceptionInline]
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
@@ -96,4 +112,66 @@ class UserProfileAdmin(admin.ModelAdmin):
         }),
     )
 
-admin.site.register(UserProfile, UserProfileAdmin)
\ No newline at end of file
+admin.site.register(UserProfile, UserProfileAdmin)
+
+from django.utils import timezone
+from .models import OutboundEmail
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected emails")
+    def requeue(self, request, queryset):
+        # Gives dead-lettered emails a fresh set of attempts
+        updated = queryset.exclude(status='SENT').update(status='PENDING', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) requeued.")
+
+
+from .models import AppointmentPayment
+
+@admin.register(AppointmentPayment)
+class AppointmentPaymentAdmin(admin.ModelAdmin):
+    list_display = ('appointment', 'stripe_payment_intent_id', 'amount', 'currency', 'status', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('stripe_payment_intent_id', 'idempotency_key')
+    readonly_fields = ('idempotency_key', 'stripe_payment_intent_id', 'client_secret', 'amount', 'currency', 'created_at', 'updated_at')
+
+
+from .models import AppointmentSeries
+
+@admin.register(AppointmentSeries)
+class AppointmentSeriesAdmin(admin.ModelAdmin):
+    list_display = ('user', 'specialist', 'start_date', 'time', 'frequency', 'occurrences', 'until', 'created_at')
+    list_filter = ('frequency',)
+    list_select_related = ('user', 'specialist')
+
+
+from .models import Room
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'room_type', 'capacity')
+    list_filter = ('room_type',)
+    search_fields = ('name',)
+
+
+from .models import SlowRequest
+
+@admin.register(SlowRequest)
+class SlowRequestAdmin(admin.ModelAdmin):
+    """Read-only view of the rolling slow-request log written by ``RequestProfilingMiddleware``."""
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'queries', 'duplicate_queries',
+                    'sql_ms', 'template_ms', 'external_ms', 'username')
+    list_filter = ('sampled', 'method', 'status_code')
+    search_fields = ('path', 'username')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
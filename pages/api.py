@@ -0,0 +1,120 @@
+import hashlib
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .availability import availability_payload, parse_availability_query
+from .caching import data_versions, release_version
+from .models import Appointment, Specialist
+from .pagination import IdCursorPagination, KeysetPagination
+from .serializers import AppointmentSerializer, SpecialistSerializer
+
+
+class VersionedETagMixin:
+    """
+    Strong ETags derived from data version tokens, so unchanged data costs no query.
+
+    The tag hashes the release, the tokens of ``etag_datasets``, today's date,
+    the user and the full URL (filters, cursors and ``?fields=`` included).
+    The tokens are read before the data, so a write that lands mid-request
+    changes the tag on the client's next poll. A matching ``If-None-Match`` is
+    answered 304 straight from the cache reads.
+    """
+    etag_datasets = ()
+
+    def etag(self, request):
+        parts = [
+            release_version(), *data_versions(*self.etag_datasets), timezone.localdate().isoformat(),
+            str(request.user.pk), request.accepted_renderer.format, request.get_full_path(),
+        ]
+        return quote_etag(hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32])
+
+    def conditional(self, request, respond):
+        """Return a 304 if the client's copy is current, otherwise ``respond()`` tagged with the ETag."""
+        etag = self.etag(request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = respond()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Clients must revalidate each time; the answer differs per user
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Cookie', 'Authorization'])
+        return response
+
+
+class ConditionalReadOnlyModelViewSet(VersionedETagMixin, viewsets.ReadOnlyModelViewSet):
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalReadOnlyModelViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, lambda: super(ConditionalReadOnlyModelViewSet, self).retrieve(request, *args, **kwargs))
+
+
+class SpecialistViewSet(ConditionalReadOnlyModelViewSet):
+    """Active specialists (staff also see inactive ones); filter with ``?specialty=``."""
+    serializer_class = SpecialistSerializer
+    pagination_class = IdCursorPagination
+    permission_classes = [permissions.AllowAny]
+    etag_datasets = ('specialists',)
+
+    def get_queryset(self):
+        queryset = Specialist.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(is_active=True)
+        if specialty := self.request.query_params.get('specialty'):
+            queryset = queryset.filter(specialty=specialty)
+        return self.serializer_class.prepare_queryset(queryset, self.request)
+
+
+class AppointmentViewSet(ConditionalReadOnlyModelViewSet):
+    """
+    The user's own appointments and those with them as the specialist; staff see all.
+
+    Lists are upcoming only unless ``?history=1``, like the dashboards, and
+    accept ``?specialist=`` and ``?status=`` filters.
+    """
+    serializer_class = AppointmentSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated]
+    etag_datasets = ('appointments', 'specialists')
+
+    def get_queryset(self):
+        queryset = Appointment.objects.all()
+        user = self.request.user
+        if not user.is_staff:
+            queryset = queryset.filter(Q(user=user) | Q(specialist__user=user))
+
+        if self.action == 'list':
+            params = self.request.query_params
+            if not params.get('history'):
+                queryset = queryset.filter(date__gte=timezone.localdate())
+            if specialist := params.get('specialist'):
+                if not specialist.isdigit():
+                    raise ValidationError({'specialist': ["Must be a specialist id."]})
+                queryset = queryset.filter(specialist_id=int(specialist))
+            if status := params.get('status'):
+                queryset = queryset.filter(status=status)
+        return self.serializer_class.prepare_queryset(queryset, self.request)
+
+
+class AvailabilityViewSet(VersionedETagMixin, viewsets.ViewSet):
+    """Free slots, with the same query parameters as ``Booking/availability/``."""
+    permission_classes = [permissions.AllowAny]
+    etag_datasets = ('appointments', 'specialists')
+
+    def list(self, request):
+        def respond():
+            try:
+                specialist_ids, start_date, end_date, min_duration = parse_availability_query(request.query_params)
+            except ValueError as e:
+                raise ValidationError({'detail': str(e)})
+            specialists = list(Specialist.objects.filter(id__in=specialist_ids, is_active=True).only(
+                'id', 'name', 'availability_start', 'availability_end', 'room_type'))
+            return Response(availability_payload(specialists, start_date, end_date, min_duration))
+        return self.conditional(request, respond)
@@ -1,15 +1,31 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class PagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
 
-from django.apps import AppConfig
-
-class pagesconfigg(AppConfig):  
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'pages'  
-
     def ready(self):
-        import pages.signals 
\ No newline at end of file
+        from .authentication import forget_user_exists
+        from .availability import invalidate_availability, invalidate_room_availability
+        from .events import publish_appointment_change
+        from .models import Appointment, CustomUser, Room, ScheduleBreak, ScheduleException, Specialist, WorkingHours
+        from .schedules import invalidate_schedule
+
+        post_save.connect(invalidate_availability, sender=Appointment, dispatch_uid='availability_on_save')
+        post_delete.connect(invalidate_availability, sender=Appointment, dispatch_uid='availability_on_delete')
+        post_save.connect(invalidate_room_availability, sender=Room, dispatch_uid='room_availability_on_save')
+        post_delete.connect(invalidate_room_availability, sender=Room, dispatch_uid='room_availability_on_delete')
+        post_save.connect(publish_appointment_change, sender=Appointment, dispatch_uid='events_on_save')
+        post_delete.connect(publish_appointment_change, sender=Appointment, dispatch_uid='events_on_delete')
+        post_save.connect(forget_user_exists, sender=CustomUser, dispatch_uid='user_exists_on_save')
+        post_delete.connect(forget_user_exists, sender=CustomUser, dispatch_uid='user_exists_on_delete')
+        for model in (Specialist, WorkingHours, ScheduleBreak, ScheduleException):
+            post_save.connect(invalidate_schedule, sender=model, dispatch_uid=f'schedule_on_save_{model.__name__}')
+            post_delete.connect(invalidate_schedule, sender=model, dispatch_uid=f'schedule_on_delete_{model.__name__}')
+        if settings.PROFILING_ENABLED:
+            from .profiling import install_query_recorder
+            connection_created.connect(install_query_recorder, dispatch_uid='profiling_query_recorder')
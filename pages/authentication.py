@@ -1,24 +1,54 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
 from .models import CustomUser
+from .ratelimit import hashed
 
 class EmailOrUsernameBackend(ModelBackend):
+    """
+    Authenticate with either a username or an email address.
+
+    One indexed lookup (email if the identifier contains '@', otherwise
+    username) and one password hash per attempt.
+    """
+
+    def get_by_identifier(self, username_or_email):
+        field = 'email' if '@' in username_or_email else 'username'
+        return CustomUser.objects.filter(**{field: username_or_email}).order_by('pk').first()
+
     def authenticate(self, request, username=None, password=None, **kwargs):
-        # Try to find the user by username or email
-        try:
-            user = CustomUser.objects.get(username=username)  # Try by username
-        except CustomUser.DoesNotExist:
-            try:
-                user = CustomUser.objects.get(email=username)  # Try by email if username not found
-            except CustomUser.DoesNotExist:
-                return None  # Return None if neither found
-        
-        # If the user is found, check the password
-        if user.check_password(password):
+        if username is None or password is None:
+            return None
+
+        user = self.get_by_identifier(username)
+        if user is None:
+            # Run the hasher anyway so unknown accounts take as long as wrong passwords
+            CustomUser().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
             return user
-        return None
+
+        # Stop ModelBackend (kept for existing sessions) from repeating the lookup and hash
+        raise PermissionDenied
 
     def get_user(self, user_id):
         try:
             return CustomUser.objects.get(pk=user_id)
         except CustomUser.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+
+
+def _exists_key(username_or_email):
+    return f"user_exists:{hashed(username_or_email)}"
+
+def user_exists(username_or_email):
+    """Existence answer for the login probe endpoints, cached for USER_EXISTS_CACHE_TIMEOUT seconds."""
+    exists = cache.get(_exists_key(username_or_email))
+    if exists is None:
+        exists = EmailOrUsernameBackend().get_by_identifier(username_or_email) is not None
+        cache.set(_exists_key(username_or_email), exists, settings.USER_EXISTS_CACHE_TIMEOUT)
+    return exists
+
+def forget_user_exists(sender, instance, **kwargs):
+    """post_save/post_delete receiver for CustomUser, so a new signup is not reported missing."""
+    cache.delete_many([_exists_key(instance.username), _exists_key(instance.email)])
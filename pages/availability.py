@@ -0,0 +1,184 @@
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .caching import bump_data_versions
+from .schedules import mask_intervals, range_mask, schedules_for
+
+
+def _cache_key(specialist_id, date):
+    return f"availability:{specialist_id}:{date.isoformat()}"
+
+
+# Tokens that change whenever room occupancy may have: one per date (any appointment that day) and one for
+# the rooms themselves. Random rather than counters, so a token lost from the cache never comes back.
+ROOMS_TOKEN_KEY = "availability:rooms"
+
+
+def _rooms_day_key(date):
+    return f"availability:rooms:{date.isoformat()}"
+
+
+def _room_tokens(dates):
+    """``{date: token}`` for the room occupancy on each of ``dates``, creating missing tokens."""
+    keys = {date: _rooms_day_key(date) for date in dates}
+    tokens = cache.get_many([ROOMS_TOKEN_KEY, *keys.values()])
+    missing = {key: uuid.uuid4().hex for key in [ROOMS_TOKEN_KEY, *keys.values()] if key not in tokens}
+    for key, token in missing.items():
+        cache.add(key, token, None)
+    if missing:
+        tokens.update(cache.get_many(missing))
+    rooms_token = tokens.get(ROOMS_TOKEN_KEY)
+    return {date: (rooms_token, tokens.get(key)) for date, key in keys.items()}
+
+
+def free_room_masks(room_types, dates):
+    """
+    ``{(room_type, date): bitmap}`` of the slots where at least one room of ``room_type`` or larger is free.
+
+    One Room query per type and one Appointment query for all of them. The
+    union is per slot: a long booking may still need the free slots to be in
+    one room, which ``book()`` checks when it claims one.
+    """
+    from .scheduling import candidate_rooms, room_bookings
+
+    rooms = {room_type: candidate_rooms(room_type) for room_type in room_types}
+    booked = room_bookings({room.id for candidates in rooms.values() for room in candidates}, dates)
+    whole_day = (1 << (24 * 60 // settings.SCHEDULE_SLOT_MINUTES)) - 1
+    masks = {}
+    for room_type, candidates in rooms.items():
+        for date in dates:
+            free = 0
+            for room in candidates:
+                free |= whole_day & ~booked[(room.id, date)]
+            masks[(room_type, date)] = free
+    return masks
+
+
+def free_slots(specialists, start_date, end_date):
+    """
+    Return ``{specialist_id: {date: [(start, end), ...]}}`` of open time ranges.
+
+    Cached per (specialist, date); every cache miss in the range is filled
+    from a single ``Appointment`` query. Free time is the day's compiled
+    working-hours bitmap with the booked bits cleared and, for specialists
+    with a ``room_type``, only where a suitable room is free as well
+    (see ``free_room_masks()``; two more queries on a miss).
+    """
+    from .models import Appointment
+
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    keys = {(specialist.id, date): _cache_key(specialist.id, date) for specialist in specialists for date in dates}
+    cached = cache.get_many(keys.values())
+
+    schedules = schedules_for(specialists)
+    room_types = {specialist.id: specialist.room_type for specialist in specialists}
+    room_tokens = _room_tokens(dates) if any(room_types.values()) else {}
+    result = {specialist.id: {} for specialist in specialists}
+    missing = {}
+    for specialist in specialists:
+        for date in dates:
+            working = schedules[specialist.id].mask(date)
+            rooms = (specialist.room_type, room_tokens[date]) if specialist.room_type else None
+            entry = cached.get(keys[(specialist.id, date)])
+            # Changed hours, breaks, exceptions or room occupancy invalidate the entry without touching the cache
+            if entry is not None and entry.get('working') == working and entry.get('rooms') == rooms:
+                result[specialist.id][date] = entry['free']
+            else:
+                missing[(specialist.id, date)] = (working, rooms)
+
+    if missing:
+        booked = {key: 0 for key in missing}
+        rows = Appointment.objects.occupying().filter(
+            specialist_id__in={specialist_id for specialist_id, _ in missing},
+            date__range=(start_date, end_date),
+        ).values_list('specialist_id', 'date', 'time', 'end_time')
+        for specialist_id, date, start, end in rows:
+            if (specialist_id, date) in booked:
+                booked[(specialist_id, date)] |= range_mask(start, end)
+
+        needs_rooms = {room_types[specialist_id] for specialist_id, _ in missing if room_types[specialist_id]}
+        room_free = free_room_masks(needs_rooms, dates) if needs_rooms else {}
+
+        to_cache = {}
+        for (specialist_id, date), (working, rooms) in missing.items():
+            open_mask = working & ~booked[(specialist_id, date)]
+            if rooms:
+                open_mask &= room_free[(room_types[specialist_id], date)]
+            free = mask_intervals(open_mask)
+            result[specialist_id][date] = free
+            to_cache[keys[(specialist_id, date)]] = {'working': working, 'rooms': rooms, 'free': free}
+        cache.set_many(to_cache, settings.AVAILABILITY_CACHE_TIMEOUT)
+
+    return result
+
+
+def parse_availability_query(params):
+    """
+    ``(specialist_ids, start_date, end_date, min_duration)`` from availability query params.
+
+    ``specialist`` is repeatable or comma separated; ``start``/``end`` are
+    YYYY-MM-DD and default to the next 7 days; ``duration`` is in minutes.
+    Raises ``ValueError`` with a message fit for the client.
+    """
+    try:
+        specialist_ids = [int(value) for param in params.getlist('specialist') for value in param.split(',') if value]
+        start_date = datetime.strptime(params['start'], '%Y-%m-%d').date() if params.get('start') else timezone.localdate()
+        end_date = datetime.strptime(params['end'], '%Y-%m-%d').date() if params.get('end') else start_date + timedelta(days=6)
+        min_duration = timedelta(minutes=int(params.get('duration', 0)))
+    except ValueError:
+        raise ValueError('Invalid specialist, date or duration parameter.')
+
+    if not specialist_ids:
+        raise ValueError('At least one specialist is required.')
+    if end_date < start_date or (end_date - start_date).days >= settings.AVAILABILITY_MAX_DAYS:
+        raise ValueError(f"Date range must be between 1 and {settings.AVAILABILITY_MAX_DAYS} days.")
+    return specialist_ids, start_date, end_date, min_duration
+
+
+def availability_payload(specialists, start_date, end_date, min_duration=timedelta(0)):
+    """Free slots as plain JSON data, leaving out gaps shorter than ``min_duration``."""
+    slots = free_slots(specialists, start_date, end_date)
+
+    data = []
+    for specialist in specialists:
+        dates = {}
+        for date, intervals in slots[specialist.id].items():
+            dates[date.isoformat()] = [
+                {'start': start.strftime('%H:%M'), 'end': end.strftime('%H:%M')}
+                for start, end in intervals
+                if datetime.combine(date, end) - datetime.combine(date, start) >= min_duration
+            ]
+        data.append({'id': specialist.id, 'name': specialist.name, 'availability': dates})
+    return {'start': start_date.isoformat(), 'end': end_date.isoformat(), 'specialists': data}
+
+
+def invalidate_days(days):
+    """
+    Drop cached availability for an iterable of ``(specialist_id, date)`` pairs, and retire the API's appointment ETags.
+
+    Room occupancy on those dates may have changed too, so the room token of
+    each date is renewed: every specialist needing a room is recomputed there.
+    """
+    days = set(days)
+    cache.delete_many([_cache_key(specialist_id, date) for specialist_id, date in days])
+    cache.set_many({_rooms_day_key(date): uuid.uuid4().hex for date in {date for _, date in days}}, None)
+    bump_data_versions('appointments')
+
+
+def invalidate_availability(sender, instance, **kwargs):
+    """post_save/post_delete receiver for ``Appointment``; drops the affected day(s)."""
+    days = {(instance.specialist_id, instance.date)}
+    loaded = getattr(instance, '_loaded_slot', None)
+    if loaded and None not in loaded:
+        days.add(loaded)
+    invalidate_days(days)
+
+
+def invalidate_room_availability(sender, **kwargs):
+    """post_save/post_delete receiver for ``Room``: availability of every specialist needing a room may change."""
+    cache.set(ROOMS_TOKEN_KEY, uuid.uuid4().hex, None)
+    bump_data_versions('appointments')
@@ -0,0 +1,112 @@
+import hashlib
+import uuid
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache as default_cache, caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils import timezone
+
+
+@lru_cache(maxsize=None)
+def release_version():
+    """
+    Identifier of the deployed release, part of every page cache key and ETag.
+
+    Uses RELEASE_VERSION (e.g. the git SHA) when set, otherwise a digest of
+    the template and static file timestamps, so a deploy busts cached pages.
+    """
+    if settings.RELEASE_VERSION:
+        return settings.RELEASE_VERSION
+    digest = hashlib.sha256()
+    roots = [Path(directory) for template in settings.TEMPLATES for directory in template['DIRS']]
+    roots += [Path(directory) for directory in settings.STATICFILES_DIRS]
+    for root in roots:
+        for path in sorted(root.rglob('*')):
+            if path.is_file():
+                digest.update(f"{path}:{path.stat().st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def _cacheable(request):
+    # Pages greet logged-in users by name and show flash messages, so only plain anonymous views are shared
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def cache_public_page(view=None, *, timeout_setting='PAGE_CACHE_TIMEOUT'):
+    """
+    Full-page cache for static marketing pages, with ETag/Last-Modified support.
+
+    Anonymous GETs are answered from PAGE_CACHE_ALIAS without running the view
+    or the template engine; a matching If-None-Match/If-Modified-Since gets a 304.
+    Use ``@cache_public_page(timeout_setting=...)`` for pages with live data.
+    """
+    if view is None:
+        return lambda view: cache_public_page(view, timeout_setting=timeout_setting)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request):
+            return view(request, *args, **kwargs)
+
+        cache = caches[settings.PAGE_CACHE_ALIAS]
+        key = f"page:{release_version()}:{hashlib.sha256(request.get_full_path().encode()).hexdigest()}"
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = response.content
+            entry = {
+                'content': content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(f"{release_version()}-{hashlib.sha256(content).hexdigest()[:16]}"),
+                'last_modified': timezone.now().timestamp(),
+            }
+            cache.set(key, entry, getattr(settings, timeout_setting))
+
+        response = get_conditional_response(request, etag=entry['etag'], last_modified=int(entry['last_modified']))
+        if response is None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    return wrapper
+
+
+def _version_key(name):
+    return f"data-version:{name}"
+
+
+def data_versions(*names):
+    """
+    The current version token of each named data set, e.g. ``data_versions('appointments')``.
+
+    A token stays the same until ``bump_data_versions()`` is called for its
+    set, so an ETag built from tokens read before the data proves the data is
+    unchanged without reading it again.
+    """
+    keys = [_version_key(name) for name in names]
+    found = default_cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            default_cache.add(key, uuid.uuid4().hex, None)
+            found[key] = default_cache.get(key) or uuid.uuid4().hex  # Evicted at once: never reuse a token
+    return [found[key] for key in keys]
+
+
+def bump_data_versions(*names):
+    """Retire the named sets' tokens once the current transaction commits, so readers never pair old data with a new token."""
+    keys = [_version_key(name) for name in names]
+    transaction.on_commit(lambda: default_cache.delete_many(keys))
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .mailgun import MailgunRejected
+
+
+def queue_email(subject, body, to, html_message=None, from_email=None):
+    """Store an email in the outbox; the ``send_queued_email`` worker delivers it."""
+    from .models import OutboundEmail
+
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def get_mail_connection():
+    """One connection for the configured backend (Mailgun in production, locmem/console locally)."""
+    return get_connection(
+        settings.EMAIL_BACKEND,
+        api_key=settings.MAILGUN_API_KEY,
+        domain=settings.MAILGUN_DOMAIN_NAME,
+        fail_silently=False,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at one day."""
+    return timedelta(seconds=min(settings.EMAIL_QUEUE_BACKOFF_SECONDS * 2 ** (attempts - 1), 60 * 60 * 24))
+
+
+def lease_due_emails(batch_size):
+    """
+    Take up to ``batch_size`` due emails for this worker in one short transaction.
+
+    The rows stay PENDING but their ``next_attempt_at`` moves
+    ``EMAIL_QUEUE_LEASE_SECONDS`` ahead, so other workers skip them while
+    they are being sent and pick them up again if this worker dies.
+    """
+    from .models import OutboundEmail
+
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status='PENDING', next_attempt_at__lte=timezone.now()).order_by('next_attempt_at')
+        if db_connection.features.has_select_for_update_skip_locked:
+            # Lets several workers lease at once without taking the same row twice
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        if batch:
+            OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(
+                next_attempt_at=timezone.now() + timedelta(seconds=settings.EMAIL_QUEUE_LEASE_SECONDS))
+    return batch
+
+
+def send_queued_emails(batch_size=None, connection=None):
+    """
+    Deliver up to ``batch_size`` due emails over a single reused connection.
+
+    The rows are leased in one short transaction, sent with no transaction
+    open (so slow Mailgun responses never hold database locks) and the
+    results written in a second one. Failed sends are rescheduled with
+    exponential backoff and moved to ``DEAD`` after
+    ``EMAIL_QUEUE_MAX_ATTEMPTS``, or at once if Mailgun rejected the message.
+    Returns ``(sent, failed)``.
+    """
+    from .models import OutboundEmail
+
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    connection = connection or get_mail_connection()
+    sent = failed = 0
+
+    batch = lease_due_emails(batch_size)
+    if not batch:
+        return sent, failed
+
+    connection.open()
+    try:
+        for email in batch:
+            message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to, connection=connection)
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+
+            email.attempts += 1
+            try:
+                message.send()
+            except Exception as e:
+                failed += 1
+                email.last_error = str(e)
+                if isinstance(e, MailgunRejected) or email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+                    email.status = 'DEAD'
+                else:
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+            else:
+                sent += 1
+                email.status = 'SENT'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+    finally:
+        connection.close()
+        # Whatever was attempted is recorded, even if the loop was cut short
+        with transaction.atomic():
+            OutboundEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    return sent, failed
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Appointment changes are pushed to the dashboards over Server-Sent Events. Every event goes to
+# ALL_CHANNEL (staff) and to its specialist's channel; the broker decides how far it travels.
+ALL_CHANNEL = 'appointments'
+
+
+def specialist_channel(specialist_id):
+    return f"specialist:{specialist_id}"
+
+
+class LocalSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def offer(self, message):
+        # Runs on the subscriber's event loop. A consumer this far behind is told to reload instead.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = {'type': 'resync'}
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """The next message, or ``None`` if none arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub: each subscriber has an asyncio queue on its own event loop.
+
+    ``publish()`` may be called from any thread (signal handlers run in the
+    sync worker threads), so messages are handed over with
+    ``call_soon_threadsafe``. Only reaches subscribers in the same process;
+    use ``RedisBroker`` when running several workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channels):
+        return LocalSubscription(self, channels)
+
+    def _add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+
+    def publish(self, channels, message):
+        with self._lock:
+            # A subscriber on several of the channels still gets the message once
+            targets = {subscription for channel in channels for subscription in self._subscriptions.get(channel, ())}
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:  # Its event loop has shut down; __aexit__ will never run
+                self._remove(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, channels):
+        self.client = client
+        self.channels = channels
+        self.pubsub = None
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def __aenter__(self):
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.aclose()
+
+
+class RedisBroker:
+    """
+    Redis pub/sub, so events reach dashboards connected to any worker or server.
+
+    Needs the ``redis`` package (already required for the Redis cache) and
+    ``REDIS_URL``.
+    """
+
+    def __init__(self):
+        import redis
+        import redis.asyncio
+
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+        self.async_client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+    def subscribe(self, channels):
+        return RedisSubscription(self.async_client, channels)
+
+    def publish(self, channels, message):
+        data = json.dumps(message)
+        for channel in channels:
+            self.client.publish(channel, data)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """The broker named by ``EVENTS_BROKER``, created once per process."""
+    return import_string(settings.EVENTS_BROKER)()
+
+
+def publish_appointment_events(events):
+    """Publish ``events`` (dicts with at least ``type``, ``id`` and ``specialist``) once the transaction commits."""
+    events = list(events)
+    if not events:
+        return
+
+    def publish():
+        # The change is already committed: a broker outage must not turn it into an error response
+        try:
+            broker = get_broker()
+            for event in events:
+                broker.publish([ALL_CHANNEL, specialist_channel(event['specialist'])], event)
+        except Exception:
+            logger.exception("Could not publish %d appointment event(s)", len(events))
+    transaction.on_commit(publish)
+
+
+def appointment_event(kind, appointment):
+    return {
+        'type': kind,
+        'id': appointment.id,
+        'specialist': appointment.specialist_id,
+        'date': appointment.date.isoformat(),
+        'time': appointment.time.strftime('%H:%M'),
+        'status': appointment.status,
+    }
+
+
+def publish_appointment_change(sender, instance, created=False, signal=None, **kwargs):
+    """post_save/post_delete receiver for ``Appointment``: created, amended, cancelled or deleted."""
+    if signal is post_delete:
+        kind = 'deleted'
+    elif created:
+        kind = 'created'
+    elif instance.status == 'CANCELLED':
+        kind = 'cancelled'
+    else:
+        kind = 'amended'
+    events = [appointment_event(kind, instance)]
+    # Moved to another specialist: the old one's calendar loses the booking
+    loaded_specialist = getattr(instance, '_loaded_slot', (None, None))[0]
+    if loaded_specialist is not None and loaded_specialist != instance.specialist_id:
+        events.append(dict(events[0], type='deleted', specialist=loaded_specialist))
+    publish_appointment_events(events)
+
+
+async def event_stream(channels):
+    """Server-Sent Events for ``channels``, with a comment line as heartbeat so proxies keep the stream open."""
+    async with get_broker().subscribe(channels) as subscription:
+        yield f"retry: {settings.EVENTS_RETRY_MILLISECONDS}\n\n"
+        while True:
+            message = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                name = 'resync' if message['type'] == 'resync' else 'appointment'
+                yield f"event: {name}\ndata: {json.dumps(message)}\n\n"
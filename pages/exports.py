@@ -0,0 +1,105 @@
+import csv
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.utils.duration import duration_string
+
+from .models import Appointment, Specialist
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    queryset: Callable  # Returns a fresh queryset for each export
+    columns: tuple  # values_list() lookups, in output order
+    headers: tuple  # Column names in the file; the import command reads the same names
+
+
+# Column layouts shared by the export views and `manage.py import_data`. Passwords are never exported.
+DATASETS = {dataset.name: dataset for dataset in [
+    Dataset(
+        'appointments',
+        lambda: Appointment.objects.all(),
+        ('id', 'user__username', 'specialist_id', 'specialist__name', 'date', 'time', 'duration', 'end_time', 'status', 'room_id'),
+        ('id', 'username', 'specialist_id', 'specialist_name', 'date', 'time', 'duration', 'end_time', 'status', 'room_id'),
+    ),
+    Dataset(
+        'specialists',
+        lambda: Specialist.objects.all(),
+        ('id', 'user__username', 'name', 'specialty', 'email', 'phone_number',
+         'availability_start', 'availability_end', 'is_active', 'session_price', 'room_type'),
+        ('id', 'username', 'name', 'specialty', 'email', 'phone_number',
+         'availability_start', 'availability_end', 'is_active', 'session_price', 'room_type'),
+    ),
+    Dataset(
+        'users',
+        lambda: get_user_model().objects.all(),
+        ('id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'is_staff', 'is_active', 'date_joined'),
+        ('id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'is_staff', 'is_active', 'date_joined'),
+    ),
+]}
+
+
+def _plain(value):
+    """Render one cell as text that ``import_data`` parses back to the same value."""
+    if value is None:
+        return ''
+    if isinstance(value, timedelta):
+        return duration_string(value)
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def export_rows(dataset, chunk_size):
+    """
+    Yield each row of ``dataset`` as a tuple of plain values, in primary key order.
+
+    ``values_list().iterator(chunk_size)`` streams from a server-side cursor where the
+    database has one, so memory stays flat however many rows there are.
+    """
+    rows = dataset.queryset().order_by('pk').values_list(*dataset.columns).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield tuple(_plain(value) for value in row)
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _in_chunks(lines, size):
+    # One write per ``size`` lines rather than per row keeps the WSGI overhead per row negligible
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_csv(dataset, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(dataset.headers)
+    yield from _in_chunks((writer.writerow(row) for row in export_rows(dataset, chunk_size)), chunk_size)
+
+
+def stream_jsonl(dataset, chunk_size):
+    lines = (json.dumps(dict(zip(dataset.headers, row))) + '\n' for row in export_rows(dataset, chunk_size))
+    yield from _in_chunks(lines, chunk_size)
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'jsonl': (stream_jsonl, 'application/x-ndjson'),
+}
@@ -2,7 +2,7 @@ from django import forms
 from .models import CustomUser, CustomUserManager
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from django.contrib.auth import get_user_model
+from django.contrib.auth import authenticate, get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator
 
@@ -45,23 +45,9 @@ class CustomLoginForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         self.request = kwargs.pop('request', None)  # Remove 'request' from kwargs
+        self.user_cache = None
         super().__init__(*args, **kwargs)  # Call the base class constructor
 
-    def clean_username(self):
-        username_or_email = self.cleaned_data['username']
-        CustomUser = get_user_model()  # Use the custom user model
-
-        if '@' in username_or_email:  # It's an email address
-            try:
-                # Attempt to find the user by email
-                user = CustomUser.objects.get(email=username_or_email)
-                return user.username  # Return the username for authentication
-            except CustomUser.DoesNotExist:
-                raise ValidationError('No account found with this email address.')
-        else:
-            # Assume it's a username
-            return username_or_email
-
     def clean_password(self):
         password = self.cleaned_data.get('password')
         if not password:
@@ -73,20 +59,16 @@ class CustomLoginForm(forms.Form):
         username_or_email = cleaned_data.get('username')
         password = cleaned_data.get('password')
 
-        # Check if the username/email and password match
+        # Single lookup and password check via EmailOrUsernameBackend
         if username_or_email and password:
-            CustomUser = get_user_model()  # Use the custom user model
-            try:
-                if '@' in username_or_email:
-                    user = CustomUser.objects.get(email=username_or_email)
-                else:
-                    user = CustomUser.objects.get(username=username_or_email)
-                if not user.check_password(password):
-                    raise ValidationError("Incorrect password.")
-            except CustomUser.DoesNotExist:
-                raise ValidationError("Invalid username or email.")
+            self.user_cache = authenticate(self.request, username=username_or_email, password=password)
+            if self.user_cache is None:
+                raise ValidationError("Invalid username/email or password.")
         return cleaned_data
 
+    def get_user(self):
+        return self.user_cache
+
     
 class CustomSignupForm(UserCreationForm):
     email = forms.EmailField(
@@ -146,11 +128,17 @@ class CustomSignupForm(UserCreationForm):
             user.save()
         return user
     
+import logging
+
 from django import forms
 from .models import Appointment, Specialist
+from .scheduling import validate_slot
 from datetime import timedelta, datetime
 from django.core.exceptions import ValidationError
 
+logger = logging.getLogger(__name__)
+
+
 class AppointmentForm(forms.ModelForm):
     DURATION_CHOICES = [
         (30, '30 mins'),
@@ -185,9 +173,6 @@ class AppointmentForm(forms.ModelForm):
         """Convert duration to timedelta object"""
         duration = self.cleaned_data.get('duration')
 
-        # Debugging line to check the value of duration before conversion
-        print(f"DEBUG: Duration selected: {duration}")
-
         try:
             # Convert the selected duration to timedelta in minutes
             duration = int(duration)
@@ -195,9 +180,7 @@ class AppointmentForm(forms.ModelForm):
         except ValueError:
             raise forms.ValidationError("Invalid duration value.")
 
-        # Debugging line to check the timedelta value after conversion
-        print(f"DEBUG: Duration as timedelta: {duration_timedelta}")
-
+        logger.debug("Duration selected: %s (%s)", duration, duration_timedelta)
         return duration_timedelta  # Return as timedelta
 
     def clean(self):
@@ -213,34 +196,71 @@ class AppointmentForm(forms.ModelForm):
             if isinstance(time, datetime):
                 time = time.time()
 
-            # Combine date and time to form a datetime object
-            start_datetime = datetime.combine(date, time)
-            end_datetime = start_datetime + duration  # Use timedelta here
+            # Let the model skip re-running the identical check in full_clean()
+            self.instance._validated_slot = (specialist.id, date, time, duration)
 
-            # Compare against specialist's availability
-            availability_start = datetime.combine(date, specialist.availability_start)
-            availability_end = datetime.combine(date, specialist.availability_end)
+            # Availability and overlap checks share one indexed query with Appointment.clean()
+            validate_slot(specialist, date, time, duration, exclude_id=self.instance.id)
 
-            if start_datetime < availability_start or end_datetime > availability_end:
-                raise forms.ValidationError(
-                    f"Appointment must be within the specialist's available hours: "
-                    f"{specialist.availability_start} to {specialist.availability_end}."
-                )
+        return cleaned_data
 
-            # Check for overlapping appointments
-            overlapping_appointments = Appointment.objects.filter(
-                specialist=specialist,
-                date=date
-            ).exclude(id=self.instance.id)  # Exclude current appointment for editing
 
-            for appointment in overlapping_appointments:
-                appointment_start = datetime.combine(appointment.date, appointment.time)
-                appointment_end = appointment_start + appointment.duration  # Compare using timedelta
+from django.utils import timezone
+from .models import AppointmentSeries
+from .scheduling import check_occurrences
 
-                # Check for overlap
-                if start_datetime < appointment_end and end_datetime > appointment_start:
-                    raise forms.ValidationError("This time slot is already booked.")
+class AppointmentSeriesForm(forms.ModelForm):
+    duration = forms.ChoiceField(choices=AppointmentForm.DURATION_CHOICES, label="Appointment Length")
+    book_available = forms.BooleanField(required=False, label="Book the available sessions and skip the rest")
 
+    class Meta:
+        model = AppointmentSeries
+        fields = ['specialist', 'start_date', 'time', 'duration', 'frequency', 'occurrences', 'until']
+        labels = {'start_date': "First session", 'occurrences': "Number of sessions", 'until': "Or repeat until"}
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+            'until': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+            'time': forms.TimeInput(attrs={'type': 'time'}, format='%H:%M'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['start_date'].input_formats = ['%Y-%m-%d']
+        self.fields['until'].input_formats = ['%Y-%m-%d']
+        self.fields['time'].input_formats = ['%H:%M']
+        self.fields['specialist'].queryset = Specialist.objects.filter(is_active=True)
+        self.report = None  # [(date, reason or None)] once the dates have been checked
+
+    def clean_duration(self):
+        try:
+            return timedelta(minutes=int(self.cleaned_data.get('duration')))
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid duration value.")
+
+    def clean(self):
+        """Check every occurrence with one query and keep the per-date report for the template."""
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        if not cleaned_data.get('occurrences') and not cleaned_data.get('until'):
+            raise ValidationError("Choose a number of sessions or an end date.")
+        if start_date and start_date < timezone.localdate():
+            self.add_error('start_date', "The first session cannot be in the past.")
+        if self.errors:
+            return cleaned_data
+
+        # ModelForm only copies cleaned values onto self.instance after clean()
+        dates = AppointmentSeries(**{field: cleaned_data.get(field) for field in
+                                     ('start_date', 'frequency', 'occurrences', 'until')}).dates()
+        report = check_occurrences(cleaned_data['specialist'], dates, cleaned_data['time'], cleaned_data['duration'])
+        self.report = sorted(report.items())
+        conflicts = sum(1 for reason in report.values() if reason)
+        if conflicts == len(dates):
+            raise ValidationError("None of the sessions in this series are available.")
+        if conflicts and not cleaned_data.get('book_available'):
+            raise ValidationError(
+                f"{conflicts} of {len(dates)} sessions are unavailable (see below). "
+                f"Tick \"Book the available sessions\" to book the other {len(dates) - conflicts}, or change the series."
+            )
         return cleaned_data
 
 
@@ -250,7 +270,7 @@ from django.conf import settings
 class SpecialistForm(forms.ModelForm):
     class Meta:
         model = Specialist
-        fields = ['user', 'name', 'specialty', 'email', 'phone_number', 'availability_start', 'availability_end', 'is_active']
+        fields = ['user', 'name', 'specialty', 'email', 'phone_number', 'availability_start', 'availability_end', 'is_active', 'room_type']
         widgets = {
             'availability_start': forms.TimeInput(attrs={'type': 'time'}, format='%H:%M'),
             'availability_end': forms.TimeInput(attrs={'type': 'time'}, format='%H:%M'),
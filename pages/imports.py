@@ -0,0 +1,358 @@
+import csv
+import json
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_datetime, parse_duration, parse_time
+
+from .authentication import forget_user_exists
+from .availability import invalidate_days
+from .caching import bump_data_versions
+from .events import appointment_event, publish_appointment_events
+from .models import Appointment, Room, Specialist
+from .schedules import range_mask, schedules_for
+from .scheduling import (
+    appointment_window, best_fit, candidate_rooms, expire_holds, hold_deadline, lock_room_days, lock_specialist_day,
+    outside_hours, room_bookings, slot_mask,
+)
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is reported against its line number."""
+
+
+def read_rows(file, fmt):
+    """Yield ``(line_number, row_dict)`` from a CSV (with header) or JSON Lines file object."""
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise RowError(f"line {line_number} is not valid JSON: {e}")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _text(row, field, required=False):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"missing {field}")
+    return value
+
+
+def _parsed(row, field, parser, required=True):
+    value = _text(row, field, required)
+    if not value:
+        return None
+    try:
+        parsed = parser(value)
+    except ValueError:  # Well formed but out of range, e.g. 25:00
+        parsed = None
+    if parsed is None:
+        raise RowError(f"invalid {field}: {value!r}")
+    return parsed
+
+
+def _duration(value):
+    # Bare numbers are minutes, as in the booking form; otherwise Django's duration format (e.g. 01:00:00)
+    return timedelta(minutes=int(value)) if value.isdigit() else parse_duration(value)
+
+
+def _boolean(row, field, default):
+    value = _text(row, field).lower()
+    if not value:
+        return default
+    if value in ('1', 'true', 't', 'yes', 'y'):
+        return True
+    if value in ('0', 'false', 'f', 'no', 'n'):
+        return False
+    raise RowError(f"invalid {field}: {value!r}")
+
+
+def _decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def _users_by_username(rows):
+    usernames = {_text(row, 'username') for _, row in rows} - {''}
+    return dict(get_user_model().objects.filter(username__in=usernames).values_list('username', 'id'))
+
+
+def import_users(rows):
+    """
+    Create users from ``rows`` with unusable passwords (they sign in after a password reset).
+
+    Usernames and emails already taken, in the database or earlier in the
+    file, are rejected using one query per batch. ``is_staff`` is never imported.
+    """
+    User = get_user_model()
+    parsed = []
+    rejected = []
+    for line, row in rows:
+        try:
+            username = _text(row, 'username', required=True)
+            email = User.objects.normalize_email(_text(row, 'email', required=True))
+            parsed.append((line, User(
+                username=username,
+                email=email,
+                first_name=_text(row, 'first_name'),
+                last_name=_text(row, 'last_name'),
+                phone_number=_text(row, 'phone_number') or None,
+                is_active=_boolean(row, 'is_active', True),
+                password=make_password(None),
+                **({'date_joined': _parsed(row, 'date_joined', parse_datetime)} if _text(row, 'date_joined') else {}),
+            )))
+        except RowError as e:
+            rejected.append((line, str(e)))
+
+    taken_usernames = set(User.objects.filter(username__in=[user.username for _, user in parsed]).values_list('username', flat=True))
+    taken_emails = set(User.objects.filter(email__in=[user.email for _, user in parsed]).values_list('email', flat=True))
+    accepted = []
+    for line, user in parsed:
+        if user.username in taken_usernames:
+            rejected.append((line, f"username {user.username!r} already exists"))
+        elif user.email in taken_emails:
+            rejected.append((line, f"email {user.email!r} already exists"))
+        else:
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+            accepted.append(user)
+
+    User.objects.bulk_create(accepted)
+    for user in accepted:
+        forget_user_exists(User, user)  # bulk_create skips post_save
+    return len(accepted), rejected
+
+
+def import_specialists(rows):
+    """
+    Create specialists owned by the user named in each row's ``username``.
+
+    A (name, email) pair that already exists, or repeats within the file, is rejected.
+    """
+    users = _users_by_username(rows)
+    specialties = {value for value, _ in Specialist.SPECIALTY_CHOICES}
+    room_types = {value for value, _ in Room.ROOM_TYPES}
+    parsed = []
+    rejected = []
+    for line, row in rows:
+        try:
+            username = _text(row, 'username', required=True)
+            if username not in users:
+                raise RowError(f"unknown username {username!r}")
+            specialty = _text(row, 'specialty', required=True)
+            if specialty not in specialties:
+                raise RowError(f"unknown specialty {specialty!r}")
+            specialist = Specialist(
+                user_id=users[username],
+                name=_text(row, 'name', required=True),
+                specialty=specialty,
+                email=_text(row, 'email', required=True),
+                phone_number=_text(row, 'phone_number') or None,
+                availability_start=_parsed(row, 'availability_start', parse_time),
+                availability_end=_parsed(row, 'availability_end', parse_time),
+                is_active=_boolean(row, 'is_active', True),
+            )
+            if specialist.availability_end <= specialist.availability_start:
+                raise RowError("availability_end must be after availability_start")
+            if _text(row, 'session_price'):
+                specialist.session_price = _parsed(row, 'session_price', _decimal)
+            if _text(row, 'room_type'):
+                specialist.room_type = _text(row, 'room_type')
+                if specialist.room_type not in room_types:
+                    raise RowError(f"unknown room_type {specialist.room_type!r}")
+            parsed.append((line, specialist))
+        except RowError as e:
+            rejected.append((line, str(e)))
+
+    taken = set(Specialist.objects.filter(
+        email__in={specialist.email for _, specialist in parsed}).values_list('name', 'email'))
+    accepted = []
+    for line, specialist in parsed:
+        if (specialist.name, specialist.email) in taken:
+            rejected.append((line, f"specialist {specialist.name!r} <{specialist.email}> already exists"))
+        else:
+            taken.add((specialist.name, specialist.email))
+            accepted.append(specialist)
+
+    Specialist.objects.bulk_create(accepted)
+    bump_data_versions('specialists')  # bulk_create skips post_save
+    return len(accepted), rejected
+
+
+def import_appointments(rows):
+    """
+    Create appointments, rejecting any that clash or fall outside working hours.
+
+    Conflicts are found set-wise: the batch's (specialist, date) days are
+    locked in a fixed order, their existing bookings come back in one query as
+    one bitmap per day, and each row is tested against it (and earlier rows of
+    the file) with bit operations. Rooms are then assigned the same way.
+    PENDING rows get the same payment hold as a booking made on the site.
+    """
+    users = _users_by_username(rows)
+    specialist_ids = {int(_text(row, 'specialist_id')) for _, row in rows if _text(row, 'specialist_id').isdigit()}
+    specialists = Specialist.objects.only('id', 'name', 'availability_start', 'availability_end', 'room_type').in_bulk(specialist_ids)
+    schedules = schedules_for(specialists.values())
+    room_ids = {int(_text(row, 'room_id')) for _, row in rows if _text(row, 'room_id').isdigit()}
+    rooms = Room.objects.in_bulk(room_ids)
+    hold_expires_at = hold_deadline()
+
+    parsed = []
+    rejected = []
+    for line, row in rows:
+        try:
+            username = _text(row, 'username', required=True)
+            if username not in users:
+                raise RowError(f"unknown username {username!r}")
+            specialist_id = _text(row, 'specialist_id')
+            specialist = specialists.get(int(specialist_id)) if specialist_id.isdigit() else None
+            if specialist is None:
+                raise RowError(f"unknown specialist_id {specialist_id!r}")
+            status = _text(row, 'status') or 'CONFIRMED'
+            if status not in ('PENDING', 'CONFIRMED'):
+                raise RowError(f"invalid status {status!r}")
+            room_id = _text(row, 'room_id')
+            if room_id and (not room_id.isdigit() or int(room_id) not in rooms):
+                raise RowError(f"unknown room_id {room_id!r}")
+            appointment = Appointment(
+                user_id=users[username],
+                specialist=specialist,
+                room=rooms[int(room_id)] if room_id else None,
+                date=_parsed(row, 'date', parse_date),
+                time=_parsed(row, 'time', parse_time),
+                duration=_parsed(row, 'duration', _duration, required=False) or timedelta(hours=1),
+                status=status,
+                hold_expires_at=hold_expires_at if status == 'PENDING' else None,
+            )
+            start, end = appointment_window(appointment.date, appointment.time, appointment.duration)
+            wanted = slot_mask(appointment.date, appointment.time, appointment.duration)
+            if wanted is None or end <= start:
+                raise RowError("appointment must start and end on the same day")
+            working = schedules[specialist.id].mask(appointment.date)
+            if wanted & ~working:
+                raise RowError(outside_hours(specialist, appointment.date, working))
+            appointment.end_time = end.time()  # bulk_create skips save()
+            parsed.append((line, appointment))
+        except RowError as e:
+            rejected.append((line, str(e)))
+
+    days = sorted({(appointment.specialist_id, appointment.date) for _, appointment in parsed})
+    for specialist_id, date in days:
+        lock_specialist_day(specialist_id, date)
+    in_batch = Appointment.objects.filter(specialist_id__in={day[0] for day in days}, date__in={day[1] for day in days})
+    expire_holds(in_batch)  # Lapsed holds would still trip the database constraints
+
+    booked = defaultdict(int)  # (specialist_id, date) -> bitmap of occupied slots
+    wanted_days = set(days)
+    for specialist_id, date, start, end in in_batch.occupying().values_list('specialist_id', 'date', 'time', 'end_time'):
+        if (specialist_id, date) in wanted_days:  # The query is the specialist x date cross product
+            booked[(specialist_id, date)] |= range_mask(start, end)
+
+    accepted = []
+    for line, appointment in parsed:
+        day = (appointment.specialist_id, appointment.date)
+        wanted = range_mask(appointment.time, appointment.end_time)
+        if wanted & booked[day]:
+            rejected.append((line, f"clashes with another booking for specialist {appointment.specialist_id} "
+                                   f"on {appointment.date} at {appointment.time}"))
+        else:
+            booked[day] |= wanted
+            accepted.append((line, appointment))
+
+    accepted, room_rejected = _assign_rooms(accepted)
+    rejected += room_rejected
+    created = Appointment.objects.bulk_create([appointment for _, appointment in accepted])
+    invalidate_days(days)  # bulk_create skips the post_save receivers
+    publish_appointment_events(appointment_event('created', appointment) for appointment in created)
+    return len(accepted), rejected
+
+
+def _assign_rooms(accepted):
+    """
+    Give rows that name a room, or whose specialist needs one, a room; reject those left without.
+
+    Rooms are chosen best-fit from one query's bitmaps, the chosen room-days
+    locked, and the bitmaps re-read once to catch claims made in between.
+    """
+    wanting = [(line, appointment) for line, appointment in accepted
+               if appointment.room_id or appointment.specialist.room_type]
+    if not wanting:
+        return accepted, []
+    dates = {appointment.date for _, appointment in wanting}
+    types = {appointment.specialist.room_type for _, appointment in wanting if appointment.specialist.room_type}
+    candidates = candidate_rooms(min(types, key=Room.size_rank)) if types else []
+
+    booked = room_bookings(candidates, dates)
+    for _, appointment in wanting:
+        if appointment.room_id is None:
+            fitting = [room for room in candidates
+                       if Room.size_rank(room.room_type) >= Room.size_rank(appointment.specialist.room_type)]
+            appointment.room = best_fit(fitting, booked, appointment.date, range_mask(appointment.time, appointment.end_time))
+        if appointment.room_id is not None:
+            booked[(appointment.room_id, appointment.date)] |= range_mask(appointment.time, appointment.end_time)
+
+    claimed = {appointment.room_id for _, appointment in wanting} - {None}
+    lock_room_days(claimed, dates)
+    in_rooms = Appointment.objects.filter(room_id__in=claimed, date__in=dates)
+    expire_holds(in_rooms)
+    booked = room_bookings(claimed, dates)
+
+    kept, rejected = [], []
+    for line, appointment in accepted:
+        wanted = range_mask(appointment.time, appointment.end_time)
+        room_day = (appointment.room_id, appointment.date)
+        if appointment.room_id is None and appointment.specialist.room_type:
+            rejected.append((line, f"no suitable room is free on {appointment.date} at {appointment.time}"))
+        elif appointment.room_id is not None and wanted & booked[room_day]:
+            rejected.append((line, f"room {appointment.room_id} is already booked on {appointment.date} at {appointment.time}"))
+        else:
+            if appointment.room_id is not None:
+                booked[room_day] |= wanted
+            kept.append((line, appointment))
+    return kept, rejected
+
+
+IMPORTERS = {
+    'users': import_users,
+    'specialists': import_specialists,
+    'appointments': import_appointments,
+}
+
+
+def import_file(dataset, file, fmt, batch_size, dry_run=False):
+    """
+    Import ``file`` into ``dataset`` in batches of ``batch_size`` rows, one transaction each.
+
+    Returns ``(created, rejected)`` where ``rejected`` lists ``(line_number, reason)``.
+    With ``dry_run`` every batch is rolled back.
+    """
+    importer = IMPORTERS[dataset]
+    created = 0
+    rejected = []
+    for batch in batched(read_rows(file, fmt), batch_size):
+        with transaction.atomic():
+            batch_created, batch_rejected = importer(batch)
+            if dry_run:
+                transaction.set_rollback(True)
+        created += batch_created
+        rejected += batch_rejected
+    return created, rejected
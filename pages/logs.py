@@ -0,0 +1,116 @@
+import atexit
+import json
+import logging
+import queue
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.module_loading import import_string
+
+# The ID of the request being handled, added to every log record it emits
+request_id = ContextVar('request_id', default='-')
+
+# An incoming X-Request-ID (from a load balancer or the client) is reused only if it looks like one
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+# Attributes every LogRecord has; anything else was passed in ``extra=`` and goes into the JSON
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIDMiddleware:
+    """Give each request an ID (``request.request_id``), log it with every record and echo it as ``X-Request-ID``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    def start(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        request.request_id = incoming if VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        return request_id.set(request.request_id)
+
+
+class RequestIDFilter(logging.Filter):
+    def filter(self, record):
+        # django.request logs error responses after the middleware has returned, but passes the request along
+        record.request_id = getattr(getattr(record, 'request', None), 'request_id', None) or request_id.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID, ``extra=`` fields and any traceback."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Format records on the calling thread, write them from a background thread.
+
+    Request threads only put the formatted line on a bounded queue; a
+    ``QueueListener`` hands it to the real handler (``target``, a stderr
+    stream by default), so slow log I/O never holds up a request. If the
+    queue is full the record is dropped rather than blocking.
+    """
+
+    def __init__(self, target='logging.StreamHandler', queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, import_string(target)())
+        self.listener.start()
+        atexit.register(self.stop_listener)  # Flush what is queued on shutdown
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop_listener(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop_listener()
+        super().close()
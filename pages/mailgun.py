@@ -0,0 +1,155 @@
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from requests.adapters import HTTPAdapter
+
+from .profiling import external_call
+
+
+class MailgunUnavailable(Exception):
+    """Raised instead of calling Mailgun while the circuit breaker is open."""
+
+
+class MailgunRejected(requests.HTTPError):
+    """Mailgun answered but refused the message (a 4xx other than 429); sending it again will not help."""
+
+
+# Responses that say Mailgun, not the message, is the problem: these count against the breaker
+TRANSIENT_STATUSES = {408, 429}
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after ``threshold`` consecutive failures.
+
+    Once ``reset_seconds`` have passed a single trial call is let through;
+    success closes the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, threshold, reset_seconds):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.opened_at = time.monotonic()  # Half-open: one trial call per reset window
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class MailgunClient:
+    """Thread-safe Mailgun messages API client over one keep-alive connection pool."""
+
+    def __init__(self, api_key, domain, base_url=None):
+        self.api_key = api_key
+        self.domain = domain
+        self.base_url = (base_url or settings.MAILGUN_API_URL).rstrip('/')
+        self.timeout = (settings.MAILGUN_CONNECT_TIMEOUT, settings.MAILGUN_READ_TIMEOUT)
+        self.breaker = CircuitBreaker(settings.MAILGUN_BREAKER_THRESHOLD, settings.MAILGUN_BREAKER_RESET_SECONDS)
+
+        self.session = requests.Session()
+        self.session.auth = ('api', api_key)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.MAILGUN_POOL_SIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def send(self, data, files=None):
+        """
+        POST one message; raises ``MailgunUnavailable`` or ``requests.RequestException`` on failure.
+
+        Only connection errors, timeouts, 5xx and 429 responses count against
+        the circuit breaker. Any other 4xx raises ``MailgunRejected``: Mailgun
+        is up, the message itself was refused.
+        """
+        if not self.breaker.allow():
+            raise MailgunUnavailable("Mailgun circuit breaker is open.")
+        try:
+            with external_call():
+                response = self.session.post(f"{self.base_url}/{self.domain}/messages", data=data, files=files, timeout=self.timeout)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500 or response.status_code in TRANSIENT_STATUSES:
+            self.breaker.record_failure()
+            response.raise_for_status()
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise MailgunRejected(f"{response.status_code} Mailgun rejected the message: {response.text[:200]}",
+                                  response=response)
+        return response
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key=None, domain=None):
+    """Process-wide client per (api key, domain) so every send shares one pool and breaker."""
+    api_key = api_key or settings.MAILGUN_API_KEY
+    domain = domain or settings.MAILGUN_DOMAIN_NAME
+    with _clients_lock:
+        client = _clients.get((api_key, domain, settings.MAILGUN_API_URL))
+        if client is None:
+            client = _clients[(api_key, domain, settings.MAILGUN_API_URL)] = MailgunClient(api_key, domain)
+    return client
+
+
+class MailgunEmailBackend(BaseEmailBackend):
+    """Django email backend that delivers through the shared ``MailgunClient``."""
+
+    def __init__(self, fail_silently=False, api_key=None, domain=None, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.client = get_client(api_key, domain)
+
+    def send_messages(self, email_messages):
+        sent = 0
+        for message in email_messages:
+            data = {
+                'from': message.from_email,
+                'to': message.to,
+                'subject': message.subject,
+                'text': message.body,
+            }
+            if message.cc:
+                data['cc'] = message.cc
+            if message.bcc:
+                data['bcc'] = message.bcc
+            if message.reply_to:
+                data['h:Reply-To'] = ', '.join(message.reply_to)
+            for content, mimetype in getattr(message, 'alternatives', []):
+                if mimetype == 'text/html':
+                    data['html'] = content
+            files = [
+                ('attachment', tuple(attachment))
+                for attachment in message.attachments
+                if isinstance(attachment, tuple) and attachment[0]
+            ]
+
+            try:
+                self.client.send(data, files=files or None)
+            except (MailgunUnavailable, requests.RequestException):
+                if not self.fail_silently:
+                    raise
+            else:
+                sent += 1
+        return sent
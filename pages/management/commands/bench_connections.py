@@ -0,0 +1,107 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what each request pays for its database connection: runs the same short "
+        "request (open, one indexed user lookup, close) with a new connection per request, "
+        "with persistent health-checked connections and, on PostgreSQL with psycopg_pool "
+        "installed, with a connection pool. Uses the database of the 'default' alias."
+    )
+
+    MODES = ['per-request', 'persistent', 'pool']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per thread and mode.")
+        parser.add_argument('--threads', type=int, default=1, help="Concurrent request threads.")
+        parser.add_argument('--mode', action='append', dest='modes', choices=self.MODES,
+                            help="Only run this mode (repeatable).")
+
+    def wrapper(self, mode):
+        """A separate connection wrapper for ``mode``, so the runs share nothing with each other or the default alias."""
+        settings_dict = dict(connections['default'].settings_dict)
+        settings_dict['OPTIONS'] = {key: value for key, value in settings_dict.get('OPTIONS', {}).items() if key != 'pool'}
+        settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+        settings_dict['CONN_HEALTH_CHECKS'] = mode == 'persistent'
+        if mode == 'pool':
+            settings_dict['OPTIONS']['pool'] = {'min_size': 1, 'max_size': max(2, self.threads)}
+        backend = load_backend(settings_dict['ENGINE'])
+        return backend.DatabaseWrapper(settings_dict, alias=f'bench-{mode}')
+
+    def run_requests(self, mode, count, username):
+        # Connections are per thread, as in a threaded server
+        wrapper = self.wrapper(mode)
+        table = get_user_model()._meta.db_table
+        timings = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete()  # What request_started does
+                with wrapper.cursor() as cursor:
+                    cursor.execute(f"SELECT id FROM {table} WHERE username = %s", [username])
+                    cursor.fetchone()
+                wrapper.close_if_unusable_or_obsolete()  # What request_finished does
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            wrapper.close()
+        return timings, wrapper
+
+    def handle(self, *args, **options):
+        if min(options['requests'], options['threads']) < 1:
+            raise CommandError("--requests and --threads must be at least 1.")
+        self.threads = options['threads']
+        vendor = connections['default'].vendor
+        modes = options['modes'] or self.MODES
+        if vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"The default database is {vendor}: connections are cheap there, so expect little difference."))
+        if 'pool' in modes and vendor != 'postgresql':
+            modes = [mode for mode in modes if mode != 'pool']
+            self.stdout.write("Skipping 'pool': connection pools need PostgreSQL.")
+        elif 'pool' in modes:
+            try:
+                import psycopg_pool  # noqa: F401
+            except ImportError:
+                modes = [mode for mode in modes if mode != 'pool']
+                self.stdout.write("Skipping 'pool': install it with `pip install \"psycopg[pool]\"`.")
+
+        username = get_user_model().objects.values_list('username', flat=True).first() or ''
+        self.stdout.write(f"Backend: {vendor}, {options['requests']} requests x {self.threads} thread(s) per mode")
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias.startswith('bench-'):
+                opened.append(connection.alias)
+        connection_created.connect(count_connection)
+        try:
+            for mode in modes:
+                opened.clear()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(self.threads) as executor:
+                    results = list(executor.map(lambda _: self.run_requests(mode, options['requests'], username),
+                                                range(self.threads)))
+                elapsed = time.perf_counter() - started
+                timings = sorted(timing for thread_timings, _ in results for timing in thread_timings)
+                line = (
+                    f"{mode:<12} p50 {statistics.median(timings):7.3f} ms  "
+                    f"p95 {timings[int(len(timings) * 0.95) - 1]:7.3f} ms  "
+                    f"{len(timings) / elapsed:8.0f} requests/s  "
+                )
+                if mode == 'pool':
+                    wrapper = results[0][1]  # The threads' wrappers share one pool
+                    line += f"pool connections opened {wrapper.pool.get_stats().get('connections_num', '?')}"
+                    wrapper.close_pool()
+                else:
+                    line += f"connections opened {len(opened)}"
+                self.stdout.write(line)
+        finally:
+            connection_created.disconnect(count_connection)
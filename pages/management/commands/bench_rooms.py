@@ -0,0 +1,100 @@
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import time as dtime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from pages.models import Appointment, Room, Specialist
+from pages.scheduling import book, overlapping_appointments
+
+
+class Command(BaseCommand):
+    help = (
+        "Book random slots for many specialists who each need a room, through book(), and report "
+        "latency, queries per booking, rejections and room usage, plus the plan of the joint "
+        "specialist/room conflict query. Removes the rooms, specialists and bookings it creates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=300)
+        parser.add_argument('--specialists', type=int, default=300)
+        parser.add_argument('--bookings', type=int, default=3000)
+        parser.add_argument('--days', type=int, default=3, help="Days the bookings are spread over.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable runs.")
+
+    def handle(self, *args, **options):
+        if min(options['rooms'], options['specialists'], options['bookings'], options['days']) < 1:
+            raise CommandError("--rooms, --specialists, --bookings and --days must be at least 1.")
+        rng = random.Random(options['seed'])
+        types = [value for value, _ in Room.ROOM_TYPES]
+
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(username=f"bench-{tag}", email=f"bench-{tag}@example.com")
+        # Small rooms are the most common, as in a real studio; specialists' needs follow the same spread
+        rooms = Room.objects.bulk_create([
+            Room(name=f"Bench {tag} {i}", room_type=rng.choices(types, weights=[5, 3, 2])[0], capacity=rng.randint(1, 12))
+            for i in range(options['rooms'])
+        ])
+        specialists = Specialist.objects.bulk_create([
+            Specialist(user=user, name=f"Bench {tag} {i}", specialty='barber', email=f"bench-{tag}@example.com",
+                       availability_start=dtime(0), availability_end=dtime(23, 59), is_active=False,
+                       room_type=rng.choices(types, weights=[5, 3, 2])[0])
+            for i in range(options['specialists'])
+        ])
+        first_day = timezone.localdate() + timedelta(days=365)
+
+        try:
+            timings, queries = [], []
+            outcomes = Counter()
+            for _ in range(options['bookings']):
+                appointment = Appointment(
+                    user=user, specialist=rng.choice(specialists), status='CONFIRMED',
+                    date=first_day + timedelta(days=rng.randrange(options['days'])),
+                    time=dtime(rng.randint(8, 18), rng.choice([0, 15, 30, 45])),
+                    duration=timedelta(minutes=rng.choice([30, 60, 90])),
+                )
+                executed = []
+                with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+                    started = time.perf_counter()
+                    try:
+                        book(appointment)
+                        outcomes['booked'] += 1
+                    except ValidationError as e:
+                        outcomes[e.messages[0]] += 1
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(executed))
+
+            timings.sort()
+            self.stdout.write(f"Backend: {connection.vendor}, rooms: {len(rooms)}, specialists: {len(specialists)}")
+            self.stdout.write(
+                f"book(): p50 {statistics.median(timings):.2f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+                f"{statistics.mean(queries):.1f} queries/booking (max {max(queries)})"
+            )
+            for outcome, total in outcomes.most_common():
+                self.stdout.write(f"  {outcome}: {total}")
+
+            booked = Appointment.objects.filter(specialist__in=specialists)
+            used = booked.values('room').distinct().count()
+            mismatched = sum(
+                Room.size_rank(room_type) < Room.size_rank(needed)
+                for room_type, needed in booked.values_list('room__room_type', 'specialist__room_type')
+            )
+            self.stdout.write(f"Rooms used: {used} of {len(rooms)}; bookings in too small a room: {mismatched}")
+            if mismatched:
+                raise CommandError("A booking was given a room smaller than its specialist needs.")
+
+            sample = booked.select_related('specialist', 'room').first()
+            if sample is not None:
+                joint = overlapping_appointments(sample.specialist, sample.date, sample.time, sample.end_time, room=sample.room)
+                self.stdout.write(self.style.MIGRATE_HEADING("\nJoint specialist/room conflict query:"))
+                self.stdout.write(joint.values('specialist_id').explain())
+        finally:
+            user.delete()  # Cascades to the specialists and their appointments
+            Room.objects.filter(id__in=[room.id for room in rooms]).delete()
@@ -0,0 +1,124 @@
+import multiprocessing
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import time as dtime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from pages.models import Appointment, Specialist
+from pages.scheduling import book
+
+# SQLite as Django sets it up with no OPTIONS: synchronous=FULL, deferred transactions, 5 s busy timeout
+UNTUNED_OPTIONS = {}
+
+
+def book_slots(options, jobs):
+    """Worker process: book ``jobs`` one after another, like one web worker handling booking requests."""
+    connection.close()
+    connection.settings_dict['OPTIONS'] = options
+    outcomes, timings = Counter(), []
+    started = time.time()
+    for user_id, specialist_id, date, start in jobs:
+        began = time.perf_counter()
+        try:
+            book(Appointment(user_id=user_id, specialist_id=specialist_id, date=date, time=start,
+                             duration=timedelta(hours=1), status='PENDING'))
+            outcomes['booked'] += 1
+        except ValidationError:
+            outcomes['rejected'] += 1
+        except OperationalError as e:
+            outcomes[f"error: {e}"] += 1
+        timings.append((time.perf_counter() - began) * 1000)
+    finished = time.time()
+    connection.close()
+    return outcomes, timings, started, finished
+
+
+class Command(BaseCommand):
+    help = (
+        "Book non-conflicting slots from several worker processes sharing the SQLite file, as "
+        "gunicorn workers would, first with SQLite's defaults and then with the tuned settings "
+        "(WAL, synchronous=NORMAL, mmap, busy timeout, BEGIN IMMEDIATE). Reports sustained "
+        "bookings per second, latency and 'database is locked' failures for each. Removes the "
+        "specialists and bookings it creates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Worker processes.")
+        parser.add_argument('--bookings', type=int, default=200, help="Bookings per worker and run.")
+        parser.add_argument('--specialists', type=int, default=20)
+
+    def set_journal_mode(self, mode):
+        # The journal mode is stored in the file; switching it needs the file to itself, so not from the workers
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode={mode}")
+        connection.close()  # Nothing open may be inherited by the forked workers
+
+    def run(self, label, options, journal_mode, workers, jobs):
+        self.set_journal_mode(journal_mode)
+        chunks = [jobs[i::workers] for i in range(workers)]
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.starmap(book_slots, [(options, chunk) for chunk in chunks])
+
+        outcomes = sum((result[0] for result in results), Counter())
+        timings = sorted(timing for result in results for timing in result[1])
+        elapsed = max(result[3] for result in results) - min(result[2] for result in results)
+        self.stdout.write(
+            f"{label:<8} {outcomes['booked'] / elapsed:7.0f} bookings/s  "
+            f"p50 {statistics.median(timings):7.2f} ms  p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  "
+            f"failed {sum(total for outcome, total in outcomes.items() if outcome.startswith('error'))}"
+        )
+        for outcome, total in sorted(outcomes.items()):
+            if outcome != 'booked':
+                self.stdout.write(f"  {outcome}: {total}")
+        return outcomes
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"This benchmark is for SQLite; the default database is {connection.vendor}.")
+        if connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("An in-memory SQLite database cannot be shared between processes.")
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("Worker processes are forked, which this platform does not support.")
+        if min(options['workers'], options['bookings'], options['specialists']) < 1:
+            raise CommandError("--workers, --bookings and --specialists must be at least 1.")
+
+        tuned_options = connection.settings_dict.get('OPTIONS', {})
+        journal_mode = getattr(settings, 'SQLITE_JOURNAL_MODE', 'DELETE')
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(username=f"bench-{tag}", email=f"bench-{tag}@example.com")
+        specialists = Specialist.objects.bulk_create([
+            Specialist(user=user, name=f"Bench {tag} {i}", specialty='barber', email=f"bench-{tag}@example.com",
+                       availability_start=dtime(0), availability_end=dtime(23, 59), is_active=False)
+            for i in range(options['specialists'])
+        ])
+        total = options['workers'] * options['bookings']
+        self.stdout.write(f"{options['workers']} workers x {options['bookings']} bookings on {connection.settings_dict['NAME']}")
+
+        try:
+            results = {}
+            runs = [('default', UNTUNED_OPTIONS, 'DELETE'), ('tuned', tuned_options, journal_mode)]
+            for run, (label, run_options, run_journal_mode) in enumerate(runs):
+                # Hourly slots across many specialist-days, so workers contend for the file, not for slots
+                first_day = timezone.localdate() + timedelta(days=365 + run * 1000)
+                jobs = [
+                    (user.id, specialists[i % len(specialists)].id,
+                     first_day + timedelta(days=i // (len(specialists) * 23)), dtime((i // len(specialists)) % 23))
+                    for i in range(total)
+                ]
+                results[label] = self.run(label, run_options, run_journal_mode, options['workers'], jobs)
+        finally:
+            self.set_journal_mode(journal_mode)  # As the settings ask for
+            user.delete()  # Cascades to the specialists, their appointments and day rows
+
+        if results['tuned']['booked'] != total:
+            raise CommandError("Some bookings failed with the tuned settings.")
+        self.stdout.write(self.style.SUCCESS("Every booking succeeded with the tuned settings."))
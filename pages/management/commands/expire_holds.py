@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pages.models import Appointment
+from pages.scheduling import expire_holds
+
+
+class Command(BaseCommand):
+    help = "Expire unpaid appointment holds whose time is up and purge old expired holds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.APPOINTMENT_HOLD_BATCH_SIZE,
+                            help="Holds expired or deleted per statement.")
+        parser.add_argument('--purge-days', type=int, default=settings.APPOINTMENT_HOLD_PURGE_DAYS,
+                            help="Delete expired holds that lapsed more than this many days ago (0 keeps them).")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep reaping instead of exiting after one pass.")
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Seconds to sleep between passes (with --loop).")
+
+    def purge(self, days, batch_size):
+        stale = Appointment.objects.filter(
+            status='EXPIRED',
+            hold_expires_at__lt=timezone.now() - timedelta(days=days),
+        ).exclude(payments__status='SUCCEEDED')  # Kept for the refund trail
+        purged = 0
+        while True:
+            ids = list(stale.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return purged
+            Appointment.objects.filter(id__in=ids).delete()
+            purged += len(ids)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_holds(batch_size=options['batch_size'])
+            purged = self.purge(options['purge_days'], options['batch_size']) if options['purge_days'] else 0
+            self.stdout.write(self.style.SUCCESS(f"Expired {expired} hold(s), purged {purged}."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,141 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from pages.models import Appointment, Specialist, UserProfile
+from pages.seeding import seed
+from pages.scheduling import overlapping_appointments
+
+
+def hot_path_indexes():
+    """
+    ``[(model, index, field)]``: the indexes the hot lookups rely on, as the models define them now.
+
+    Exactly one of ``index`` (an ``Index`` or ``UniqueConstraint``) and
+    ``field`` (a ``db_index=True`` field) is set. Foreign key indexes are left
+    out: they predate the hot-path work (migration 0022 and later).
+    """
+    User = get_user_model()
+    entries = [(Appointment, index, None) for index in Appointment._meta.indexes]
+    entries += [(Appointment, constraint, None) for constraint in Appointment._meta.constraints
+                if isinstance(constraint, models.UniqueConstraint)]
+    entries += [(User, index, None) for index in User._meta.indexes]
+    entries += [(Specialist, None, Specialist._meta.get_field('specialty')),
+                (UserProfile, None, UserProfile._meta.get_field('reset_token'))]
+    return entries
+
+
+def _unindexed(model, field):
+    copy = field.clone()
+    copy.db_index = False
+    copy.set_attributes_from_name(field.name)
+    copy.model = model
+    return copy
+
+
+class Command(BaseCommand):
+    help = (
+        "Print query plans and timings for the hot Appointment/CustomUser/UserProfile lookups. "
+        "With --compare, seed a throwaway test database, run them without the hot-path indexes "
+        "(as before migration 0022), recreate the indexes and run them again, e.g. "
+        "`explain_hot_queries --compare --seed 1000000`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, metavar='APPOINTMENTS',
+                            help="Bulk-insert this many appointments first (e.g. 1000000).")
+        parser.add_argument('--specialists', type=int, default=200)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20, help="Executions per query for the timing column.")
+        parser.add_argument('--compare', action='store_true',
+                            help="Work on a throwaway test database and compare without and with the indexes.")
+
+    def queries(self):
+        appointment = Appointment.objects.order_by('-id').select_related('specialist', 'user').first()
+        if appointment is None:
+            raise CommandError("No appointments to explain; pass --seed N.")
+        user = appointment.user
+        profile = UserProfile.objects.filter(reset_token__isnull=False).first()
+
+        return {
+            'overlap check (specialist + date)': overlapping_appointments(
+                appointment.specialist, appointment.date, appointment.time, appointment.end_time).values('id'),
+            'overlap check (specialist or room + date)': overlapping_appointments(
+                appointment.specialist, appointment.date, appointment.time, appointment.end_time,
+                room=appointment.room_id or 0).values('id'),
+            'client appointments (user)': Appointment.objects.filter(user=user).for_listing()[:25],
+            'specialty listing (specialist__specialty)': Appointment.objects.filter(
+                specialist__specialty=appointment.specialist.specialty).for_listing()[:25],
+            'login by email': get_user_model().objects.filter(email=user.email),
+            'reset token lookup': UserProfile.objects.filter(reset_token=profile.reset_token if profile else '000000'),
+            'active specialists by specialty': Specialist.objects.filter(specialty=appointment.specialist.specialty, is_active=True),
+        }
+
+    def explain(self, repeat):
+        """Print each query's plan and mean time; returns ``{label: ms}``."""
+        timings = {}
+        self.stdout.write(f"Backend: {connection.vendor}, appointments: {Appointment.objects.count()}")
+        for label, queryset in self.queries().items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            timings[label] = (time.perf_counter() - started) * 1000 / repeat
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}: {timings[label]:.2f} ms/query"))
+            self.stdout.write(queryset.explain())
+        return timings
+
+    def set_indexes(self, present):
+        """Drop (``present=False``) or recreate the hot-path indexes; returns the seconds it took."""
+        started = time.perf_counter()
+        with connection.schema_editor() as editor:
+            for model, index, field in hot_path_indexes():
+                if field is not None:
+                    old, new = (_unindexed(model, field), field) if present else (field, _unindexed(model, field))
+                    editor.alter_field(model, old, new)
+                elif isinstance(index, models.UniqueConstraint):
+                    (editor.add_constraint if present else editor.remove_constraint)(model, index)
+                else:
+                    (editor.add_index if present else editor.remove_index)(model, index)
+        return time.perf_counter() - started
+
+    def compare(self, options):
+        if not options['seed']:
+            raise CommandError("--compare needs --seed N to fill the throwaway database.")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f"Seeding {options['seed']} appointments into a throwaway test database...")
+            seed(options['specialists'], options['users'], options['seed'], stdout=self.stdout)
+            UserProfile.objects.bulk_create([UserProfile(user_id=user_id, reset_token=f"{i % 1000000:06d}")
+                                             for i, user_id in enumerate(get_user_model().objects.values_list('id', flat=True))],
+                                            batch_size=5000, ignore_conflicts=True)
+
+            dropped = self.set_indexes(False)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== Without the hot-path indexes (dropped in {dropped:.1f} s)"))
+            before = self.explain(options['repeat'])
+            built = self.set_indexes(True)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== With the hot-path indexes (built in {built:.1f} s)"))
+            after = self.explain(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSummary (ms/query)"))
+        for label in before:
+            self.stdout.write(f"{label:<45} {before[label]:10.2f} -> {after[label]:8.2f}  "
+                              f"({before[label] / max(after[label], 1e-6):.0f}x)")
+
+    def handle(self, *args, **options):
+        if options['seed'] and (options['specialists'] < 1 or options['users'] < 1):
+            raise CommandError("--specialists and --users must be at least 1 when seeding.")
+        if options['compare']:
+            self.compare(options)
+            return
+        if options['seed']:
+            self.stdout.write(f"Seeding {options['seed']} appointments...")
+            seed(options['specialists'], options['users'], options['seed'], stdout=self.stdout)
+        self.explain(options['repeat'])
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.imports import IMPORTERS, RowError, import_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import users, specialists or appointments from CSV or JSON Lines, in the column "
+        "layout of the export views (export/<dataset>.csv). Import users, then specialists, then "
+        "appointments; appointments name their specialist by the new specialist_id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE,
+                            help="Rows validated and inserted per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate everything, then roll back.")
+        parser.add_argument('--show-rejected', type=int, default=50,
+                            help="Rejected rows to list (the total is always reported).")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in ('csv', 'jsonl'):
+            raise CommandError("Cannot tell the format from the extension; pass --format csv or --format jsonl.")
+
+        try:
+            with path.open(newline='', encoding='utf-8-sig') as file:
+                created, rejected = import_file(
+                    options['dataset'], file, fmt, options['batch_size'], dry_run=options['dry_run'])
+        except (OSError, RowError) as e:
+            raise CommandError(str(e))
+
+        for line, reason in rejected[:options['show_rejected']]:
+            self.stderr.write(f"line {line}: {reason}")
+        if len(rejected) > options['show_rejected']:
+            self.stderr.write(f"... and {len(rejected) - options['show_rejected']} more")
+
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {created} {options['dataset']}, rejected {len(rejected)}."))
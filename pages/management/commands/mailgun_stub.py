@@ -0,0 +1,53 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand
+
+
+class MailgunStubHandler(BaseHTTPRequestHandler):
+    """Accepts ``POST /v3/<domain>/messages`` and answers like Mailgun without sending anything."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so the pooled client reuses its connection
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.rstrip('/').endswith('/messages'):
+            self._respond(404, {'message': 'Not found'})
+            return
+
+        fields = parse_qs(body.decode(errors='replace')) if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded') else {}
+        self.server.command.stdout.write(f"Mailgun stub: {fields.get('subject', ['(multipart)'])[0]} -> {', '.join(fields.get('to', []))}")
+        self._respond(self.server.status, {'id': '<stub@localhost>', 'message': 'Queued. Thank you.'})
+
+    def _respond(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for the Mailgun messages API (set MAILGUN_API_URL=http://127.0.0.1:<port>/v3)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8025)
+        parser.add_argument('--status', type=int, default=200,
+                            help="HTTP status to answer with, e.g. 503 to exercise retries and the circuit breaker.")
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), MailgunStubHandler)
+        server.command = self
+        server.status = options['status']
+        self.stdout.write(f"Mailgun stub listening on http://127.0.0.1:{options['port']}/v3")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,270 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from datetime import time as dtime, timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from pages.caching import release_version
+from pages.models import Appointment, Specialist
+from pages.seeding import SEED_PASSWORD, seed
+
+# Memory is measured in a separate, shorter pass: tracemalloc slows every allocation down
+MEMORY_ITERATIONS = 5
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database in bulk and benchmark the booking, login, dashboard, "
+        "specialist appointment list and check_user_exists hot paths through the full request "
+        "stack. Writes latency percentiles, query counts and peak memory as JSON and, given "
+        "--baseline, fails if any scenario regressed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--specialists', type=int, default=50)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=30, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per scenario first.")
+        parser.add_argument('--scenario', action='append', dest='scenarios', metavar='NAME',
+                            help="Only run this scenario (repeatable).")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Results JSON from an earlier run to compare against.")
+        parser.add_argument('--time-tolerance', type=float, default=0.25,
+                            help="Allowed p95 latency growth over the baseline, as a fraction.")
+        parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                            help="Allowed peak memory growth over the baseline, as a fraction.")
+
+    # Scenarios: each returns a callable that makes request number ``i`` and returns the response
+
+    def scenario_booking(self):
+        client = self.logged_in(self.client_user)
+        first_day = timezone.localdate() + timedelta(days=400)  # Clear of the seeded appointments
+
+        def request(i):
+            # A distinct free slot per request, so every booking succeeds
+            specialist = self.specialists[i % len(self.specialists)]
+            day = first_day + timedelta(days=i // len(self.specialists))
+            return client.post(reverse('Booking'), {
+                'specialist': specialist.id, 'date': day.isoformat(), 'time': '10:00', 'duration': '60',
+            })
+        return request, {302}
+
+    def scenario_login(self):
+        def request(i):
+            user = self.users[i % len(self.users)]
+            return Client().post(reverse('login'), {'username': user.username, 'password': SEED_PASSWORD})
+        return request, {302}
+
+    def scenario_dashboard_client(self):
+        client = self.logged_in(self.client_user)
+        return lambda i: client.get(reverse('Dashboard')), {200}
+
+    def scenario_dashboard_staff(self):
+        client = self.logged_in(self.staff_user)
+        return lambda i: client.get(reverse('Dashboard')), {200}
+
+    def scenario_view_appointments(self):
+        client = self.logged_in(self.client_user)
+        specialist = self.specialists[0]
+        return lambda i: client.get(reverse('view_appointments', args=[specialist.id])), {200}
+
+    def scenario_check_user_exists(self):
+        client = Client()
+
+        def request(i):
+            # A different client address and identifier each time, as for real visitors, so the
+            # rate limiter is exercised without every request being refused
+            user = self.users[i % len(self.users)]
+            return client.get(reverse('check_user_exists'), {'username_or_email': user.email},
+                              REMOTE_ADDR=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}")
+        return request, {200}
+
+    SCENARIOS = ['booking', 'login', 'dashboard_client', 'dashboard_staff', 'view_appointments', 'check_user_exists']
+
+    def logged_in(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def measure(self, name, iterations, warmup):
+        request, expected = getattr(self, f'scenario_{name}')()
+        counter = iter(range(10 ** 9))  # Every request gets a fresh number, warm-up included
+        for _ in range(warmup):
+            request(next(counter))
+
+        timings, queries, statuses = [], [], Counter()
+        for _ in range(iterations):
+            executed = []
+            with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+                started = time.perf_counter()
+                response = request(next(counter))
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(executed))
+            statuses[response.status_code] += 1
+
+        tracemalloc.start()
+        for _ in range(MEMORY_ITERATIONS):
+            tracemalloc.reset_peak()
+            request(next(counter))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        unexpected = {status: total for status, total in statuses.items() if status not in expected}
+        if unexpected:
+            raise CommandError(f"{name}: unexpected status codes {unexpected} (expected {sorted(expected)}).")
+
+        timings.sort()
+        return {
+            'iterations': iterations,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'max_ms': round(timings[-1], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'statuses': {str(status): total for status, total in sorted(statuses.items())},
+        }
+
+    def count_queries(self, client, url):
+        executed = []
+        with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+            client.get(url)
+        return len(executed)
+
+    def fixed_query_checks(self):
+        """
+        The listing pages must run the same number of queries however many appointments they show.
+
+        Each page is counted, then 30 more appointments are added to what it
+        lists and it is counted again.
+        """
+        user = get_user_model().objects.create_user(username='perf-fixed', email='perf-fixed@example.com')
+        specialist = Specialist.objects.create(
+            user=user, name='Perf Fixed', specialty=self.staff_specialty, email='perf-fixed@example.com',
+            availability_start=dtime(9), availability_end=dtime(17),
+        )
+        pages = {
+            'dashboard_client': (self.logged_in(user), reverse('Dashboard')),
+            'dashboard_staff': (self.logged_in(self.staff_user), reverse('Dashboard')),
+            'view_appointments': (self.logged_in(user), reverse('view_appointments', args=[specialist.id])),
+        }
+        for client, url in pages.values():
+            client.get(url)  # Warm the schedule, session and template caches
+
+        before = {name: self.count_queries(client, url) for name, (client, url) in pages.items()}
+        first_day = timezone.localdate() + timedelta(days=1)
+        Appointment.objects.bulk_create([
+            Appointment(user=user, specialist=specialist, date=first_day + timedelta(days=day), time=dtime(9 + slot),
+                        end_time=dtime(10 + slot), duration=timedelta(hours=1), status='CONFIRMED')
+            for day in range(5) for slot in range(6)
+        ])
+        after = {name: self.count_queries(client, url) for name, (client, url) in pages.items()}
+        return {name: {'before': before[name], 'after': after[name], 'ok': before[name] == after[name]} for name in pages}
+
+    def compare(self, results, baseline, time_tolerance, memory_tolerance):
+        regressions = []
+        for name, current in results['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if previous is None:
+                continue
+            if current['queries_max'] > previous['queries_max']:
+                regressions.append(f"{name}: queries {previous['queries_max']} -> {current['queries_max']}")
+            if current['p95_ms'] > previous['p95_ms'] * (1 + time_tolerance):
+                regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms")
+            if current['peak_memory_kb'] > previous['peak_memory_kb'] * (1 + memory_tolerance):
+                regressions.append(f"{name}: peak memory {previous['peak_memory_kb']:.0f} KB -> {current['peak_memory_kb']:.0f} KB")
+        return regressions
+
+    def run_suite(self, options, names):
+        self.stdout.write(f"Seeding {options['specialists']} specialists, {options['users']} users, "
+                          f"{options['appointments']} appointments...")
+        self.specialists, self.users = seed(options['specialists'], options['users'], options['appointments'])
+        self.client_user = Appointment.objects.order_by('id').values_list('user', flat=True).first()
+        self.client_user = get_user_model().objects.get(id=self.client_user) if self.client_user else self.users[0]
+        self.staff_specialty = self.specialists[0].specialty
+        self.staff_user = get_user_model().objects.create_user(
+            username='perf-staff', email='perf-staff@example.com', is_staff=True)
+        # The staff dashboard lists the appointments of the staff member's specialty
+        profile = self.staff_user.create_profile()
+        profile.specialty = self.staff_specialty
+        profile.save()
+
+        results = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'release': release_version(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'seed': {key: options[key] for key in ('specialists', 'users', 'appointments')},
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            results['scenarios'][name] = summary = self.measure(name, options['iterations'], options['warmup'])
+            self.stdout.write(
+                f"{name:<20} p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  "
+                f"p99 {summary['p99_ms']:8.2f} ms  queries {summary['queries_max']:3}  "
+                f"peak {summary['peak_memory_kb']:8.1f} KB"
+            )
+        results['checks'] = {'fixed_query_count': self.fixed_query_checks()}
+        for name, check in results['checks']['fixed_query_count'].items():
+            self.stdout.write(f"fixed query count {name}: {check['before']} -> {check['after']}")
+        return results
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or self.SCENARIOS
+        unknown = set(names) - set(self.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from {', '.join(self.SCENARIOS)}.")
+        if min(options['specialists'], options['users'], options['iterations']) < 1:
+            raise CommandError("--specialists, --users and --iterations must be at least 1.")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        # A fresh test database and a private cache: repeatable, and the real data and cache are never touched
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                                       'LOCATION': 'perf-suite'}}):
+                results = self.run_suite(options, names)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = [f"fixed query count {name}: {check['before']} -> {check['after']}"
+                    for name, check in results['checks']['fixed_query_count'].items() if not check['ok']]
+        if baseline is not None:
+            failures += self.compare(results, baseline, options['time_tolerance'], options['memory_tolerance'])
+        results['regressions'] = failures
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if failures:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No regressions." if baseline is not None else "Done."))
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pages.emails import get_mail_connection, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver emails waiting in the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE,
+                            help="Maximum emails sent per connection.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling the outbox instead of exiting once it is drained.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between polls when the outbox is empty (with --loop).")
+
+    def handle(self, *args, **options):
+        connection = get_mail_connection()
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = send_queued_emails(options['batch_size'], connection=connection)
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                continue  # Outbox may still have due rows; go straight to the next batch
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} email(s), {total_failed} failed."))
@@ -0,0 +1,92 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from pages.models import Appointment, Specialist
+from pages.scheduling import book
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel bookings at one slot and assert exactly one wins, then measure "
+        "throughput for non-conflicting bookings. Runs against the configured database "
+        "and removes the specialists and client it creates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--attempts', type=int, default=300, help="Concurrent bookings for the contested slot.")
+        parser.add_argument('--distinct', type=int, default=300, help="Non-conflicting bookings for the throughput run.")
+        parser.add_argument('--specialists', type=int, default=10,
+                            help="Specialists the non-conflicting bookings are spread over.")
+
+    def attempt(self, user, specialist, date, start):
+        try:
+            book(Appointment(user=user, specialist=specialist, date=date, time=start,
+                             duration=timedelta(hours=1), status='PENDING'))
+            return 'booked'
+        except ValidationError:
+            return 'rejected'
+        except Exception as e:
+            return f"error: {type(e).__name__}: {e}"
+        finally:
+            connection.close()  # Each worker thread has its own connection
+
+    def run(self, threads, jobs):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            outcomes = Counter(pool.map(lambda job: self.attempt(*job), jobs))
+        return outcomes, time.perf_counter() - started
+
+    def report(self, label, outcomes, elapsed, count):
+        self.stdout.write(f"{label}: {count} bookings in {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+        for outcome, total in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {total}")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("An in-memory SQLite database cannot be shared between threads.")
+
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(username=f"stress-{tag}", email=f"stress-{tag}@example.com")
+        specialists = [
+            Specialist.objects.create(
+                user=user, name=f"Stress {tag} {i}", specialty='barber', email=f"stress-{tag}@example.com",
+                availability_start=dtime(0), availability_end=dtime(23, 59), is_active=False,
+            )
+            for i in range(max(1, options['specialists']))
+        ]
+        date = timezone.localdate() + timedelta(days=365)
+
+        try:
+            # Staggered starts inside one hour all overlap each other, so the unique
+            # start-time constraint alone cannot keep out the losers; only the lock can
+            contested = [(user, specialists[0], date, dtime(10, (i % 12) * 5)) for i in range(options['attempts'])]
+            outcomes, elapsed = self.run(options['threads'], contested)
+            self.report("Contested slot", outcomes, elapsed, options['attempts'])
+            won = Appointment.objects.filter(specialist=specialists[0], date=date).count()
+            if won != 1 or outcomes['booked'] != 1:
+                raise CommandError(f"Expected exactly one booking for the contested slot, got {won}.")
+
+            # Hourly slots across many specialist-days, so workers rarely share a lock
+            distinct = [
+                (user, specialists[i % len(specialists)], date + timedelta(days=1 + i // (len(specialists) * 23)),
+                 dtime((i // len(specialists)) % 23))
+                for i in range(options['distinct'])
+            ]
+            outcomes, elapsed = self.run(options['threads'], distinct)
+            self.report("Non-conflicting slots", outcomes, elapsed, options['distinct'])
+            if outcomes['booked'] != options['distinct']:
+                raise CommandError("Some non-conflicting bookings failed.")
+        finally:
+            user.delete()  # Cascades to the specialists, their appointments and day rows
+
+        self.stdout.write(self.style.SUCCESS("Exactly one booking won the contested slot."))
@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the PaymentIntents API.
+
+    Honours Idempotency-Key like Stripe, can post a signed
+    ``payment_intent.succeeded`` webhook for each new intent, and accepts
+    refunds of known intents.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        fields = {key: values[0] for key, values in parse_qs(body).items()}
+        if self.path.rstrip('/') == '/v1/refunds':
+            self.refund(fields)
+            return
+        if self.path.rstrip('/') != '/v1/payment_intents':
+            self._respond(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown stub route'}})
+            return
+
+        key = self.headers.get('Idempotency-Key') or uuid.uuid4().hex
+        with self.server.lock:
+            intent = self.server.intents_by_key.get(key)
+            created = intent is None
+            if created:
+                intent_id = f"pi_stub_{uuid.uuid4().hex[:16]}"
+                intent = {
+                    'id': intent_id,
+                    'object': 'payment_intent',
+                    'amount': int(fields.get('amount', 0)),
+                    'currency': fields.get('currency', 'gbp'),
+                    'status': 'requires_payment_method',
+                    'client_secret': f"{intent_id}_secret_stub",
+                    'metadata': {k[len('metadata['):-1]: v for k, v in fields.items() if k.startswith('metadata[')},
+                }
+                self.server.intents_by_key[key] = intent
+                self.server.intents[intent_id] = intent
+
+        self._respond(200, intent)
+        if created and self.server.webhook_url:
+            threading.Timer(self.server.webhook_delay, self.server.command.send_webhook, [intent]).start()
+
+    def refund(self, fields):
+        intent = self.server.intents.get(fields.get('payment_intent'))
+        if intent is None:
+            self._respond(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent'}})
+            return
+        self.server.command.stdout.write(f"Stripe stub: refunded {intent['id']}")
+        self._respond(200, {'id': f"re_stub_{uuid.uuid4().hex[:16]}", 'object': 'refund', 'amount': intent['amount'],
+                            'payment_intent': intent['id'], 'status': 'succeeded'})
+
+    def do_GET(self):
+        intent = self.server.intents.get(self.path.rstrip('/').rsplit('/', 1)[-1])
+        if intent is None:
+            self._respond(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent'}})
+        else:
+            self._respond(200, intent)
+
+    def _respond(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for Stripe PaymentIntents (set STRIPE_API_BASE=http://127.0.0.1:<port>)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--webhook-url', default='',
+                            help="If set, POST a signed payment_intent.succeeded here for every new intent.")
+        parser.add_argument('--webhook-delay', type=float, default=1.0)
+
+    def send_webhook(self, intent):
+        payload = json.dumps({
+            'id': f"evt_stub_{uuid.uuid4().hex[:16]}",
+            'object': 'event',
+            'type': 'payment_intent.succeeded',
+            'data': {'object': dict(intent, status='succeeded')},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(settings.STRIPE_WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        request = Request(self.webhook_url, data=payload.encode(), headers={
+            'Content-Type': 'application/json',
+            'Stripe-Signature': f"t={timestamp},v1={signature}",
+        })
+        with urlopen(request, timeout=10) as response:
+            self.stdout.write(f"Stripe stub: {intent['id']} succeeded -> webhook {response.status}")
+
+    def handle(self, *args, **options):
+        self.webhook_url = options['webhook_url']
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), StripeStubHandler)
+        server.command = self
+        server.lock = threading.Lock()
+        server.intents = {}
+        server.intents_by_key = {}
+        server.webhook_url = options['webhook_url']
+        server.webhook_delay = options['webhook_delay']
+        self.stdout.write(f"Stripe stub listening on http://127.0.0.1:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
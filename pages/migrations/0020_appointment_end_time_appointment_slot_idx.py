@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.db import migrations, models
+
+
+def populate_end_time(apps, schema_editor):
+    Appointment = apps.get_model('pages', 'Appointment')
+    appointments = list(Appointment.objects.all())
+    for appointment in appointments:
+        appointment.end_time = (datetime.combine(appointment.date, appointment.time) + appointment.duration).time()
+    Appointment.objects.bulk_update(appointments, ['end_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0019_userprofile_specialty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['specialist', 'date', 'time'], name='appointment_slot_idx'),
+        ),
+    ]
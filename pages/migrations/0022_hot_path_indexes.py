@@ -0,0 +1,90 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+def release_cancellations_and_clashes(apps, schema_editor):
+    """
+    Bring existing rows in line with the constraints added below, which would otherwise fail to build.
+
+    cancel_appointment stored 'Cancelled': normalised to 'CANCELLED', which
+    the constraints exempt. Bookings made before any locking may clash: of
+    each specialist's overlapping live bookings, confirmed ones and then the
+    oldest are kept and the rest are marked CANCELLED.
+    """
+    Appointment = apps.get_model('pages', 'Appointment')
+    Appointment.objects.filter(status__iexact='cancelled').exclude(status='CANCELLED').update(status='CANCELLED')
+
+    def clashes(day):
+        kept = []
+        for pk, start, end, _ in sorted(day, key=lambda row: (row[3] != 'CONFIRMED', row[0])):
+            end = end or start
+            if any(start == kept_start or (start < kept_end and kept_start < end) for kept_start, kept_end in kept):
+                yield pk
+            else:
+                kept.append((start, end))
+
+    released, day, current = [], [], None
+    rows = Appointment.objects.exclude(status='CANCELLED').order_by('specialist_id', 'date').values_list(
+        'specialist_id', 'date', 'id', 'time', 'end_time', 'status')
+    for specialist_id, date, pk, start, end, status in rows.iterator(chunk_size=5000):
+        if (specialist_id, date) != current:
+            released.extend(clashes(day))
+            day, current = [], (specialist_id, date)
+        day.append((pk, start, end, status))
+    released.extend(clashes(day))
+    for offset in range(0, len(released), 1000):
+        Appointment.objects.filter(id__in=released[offset:offset + 1000]).update(status='CANCELLED')
+
+
+def add_overlap_exclusion(apps, schema_editor):
+    # Only PostgreSQL can enforce "no two ranges overlap" in the database itself
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        'ALTER TABLE pages_appointment ADD CONSTRAINT appointment_no_overlap '
+        'EXCLUDE USING gist (specialist_id WITH =, tsrange(date + time, date + end_time) WITH &&) '
+        "WHERE (status <> 'CANCELLED')"
+    )
+
+
+def remove_overlap_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE pages_appointment DROP CONSTRAINT IF EXISTS appointment_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('pages', '0021_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='specialist',
+            name='specialty',
+            field=models.CharField(choices=[('Beauticians', 'Beauticians'), ('hairdresser', 'Hairdresser'), ('tattoo_artist', 'Tattoo Artist'), ('nail_technician', 'Nail Technician'), ('dog_groomer', 'Dog Groomer'), ('aesthetic_practitioner', 'Aesthetic Practitioner'), ('sports_therapist', 'Sports Therapist'), ('physiotherapist', 'Physiotherapist'), ('chiropractor', 'Chiropractor'), ('semi_permanent_makeup', 'Semi-Permanent Makeup Artist')], db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='reset_token',
+            field=models.CharField(blank=True, db_index=True, max_length=6, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', 'date', 'time'], name='appointment_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['email'], name='customuser_email_idx'),
+        ),
+        migrations.RunPython(release_cancellations_and_clashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'CANCELLED'), _negated=True), fields=('specialist', 'date', 'time'), name='appointment_unique_start'),
+        ),
+        migrations.RunPython(add_overlap_exclusion, remove_overlap_exclusion),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0022_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='specialist',
+            name='specialty',
+            field=models.CharField(choices=[('Beauticians', 'Beauticians'), ('hairdresser', 'Hairdresser'), ('barber', 'Barber'), ('tattoo_artist', 'Tattoo Artist'), ('nail_technician', 'Nail Technician'), ('dog_groomer', 'Dog Groomer'), ('aesthetic_practitioner', 'Aesthetic Practitioner'), ('sports_therapist', 'Sports Therapist'), ('physiotherapist', 'Physiotherapist'), ('chiropractor', 'Chiropractor'), ('semi_permanent_makeup', 'Semi-Permanent Makeup Artist')], db_index=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0023_specialist_barber_specialty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True)),
+                ('stripe_payment_intent_id', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('client_secret', models.CharField(blank=True, max_length=255)),
+                ('amount', models.PositiveIntegerField()),
+                ('currency', models.CharField(default='gbp', max_length=3)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='pages.appointment')),
+            ],
+        ),
+    ]
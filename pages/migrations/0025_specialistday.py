@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0024_appointmentpayment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_days', to='pages.specialist')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('specialist', 'date'), name='specialist_day_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+def _replace_overlap_exclusion(schema_editor, where):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE pages_appointment DROP CONSTRAINT IF EXISTS appointment_no_overlap')
+    schema_editor.execute(
+        'ALTER TABLE pages_appointment ADD CONSTRAINT appointment_no_overlap '
+        'EXCLUDE USING gist (specialist_id WITH =, tsrange(date + time, date + end_time) WITH &&)' + where
+    )
+
+
+def exempt_expired_holds(apps, schema_editor):
+    # Expired holds, like cancellations, must not stop their slot being booked again
+    _replace_overlap_exclusion(schema_editor, " WHERE (status NOT IN ('EXPIRED', 'CANCELLED'))")
+
+
+def include_expired_holds(apps, schema_editor):
+    _replace_overlap_exclusion(schema_editor, " WHERE (status <> 'CANCELLED')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0025_specialistday'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='appointment_unique_start',
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('EXPIRED', 'Expired')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'hold_expires_at'], name='appointment_hold_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('EXPIRED', 'CANCELLED')), _negated=True), fields=('specialist', 'date', 'time'), name='appointment_unique_start'),
+        ),
+        migrations.RunPython(exempt_expired_holds, include_expired_holds),
+    ]
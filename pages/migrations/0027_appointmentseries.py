@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:59
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0026_appointment_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('time', models.TimeField()),
+                ('duration', models.DurationField(default=datetime.timedelta(seconds=3600))),
+                ('frequency', models.CharField(choices=[('WEEKLY', 'Weekly'), ('FORTNIGHTLY', 'Fortnightly')], default='WEEKLY', max_length=11)),
+                ('occurrences', models.PositiveIntegerField(blank=True, null=True)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pages.specialist')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'appointment series',
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='pages.appointmentseries'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:01
+
+import django.db.models.deletion
+import pages.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0027_appointmentseries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleBreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], null=True)),
+                ('start', models.TimeField()),
+                ('end', models.TimeField()),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_breaks', to='pages.specialist')),
+            ],
+            options={
+                'ordering': ['weekday', 'start'],
+            },
+            bases=(pages.models.ScheduleRangeMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start', models.TimeField()),
+                ('end', models.TimeField()),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='pages.specialist')),
+            ],
+            options={
+                'verbose_name_plural': 'working hours',
+                'ordering': ['weekday', 'start'],
+            },
+            bases=(pages.models.ScheduleRangeMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CLOSED', 'Closed'), ('OPEN', 'Open (override hours)')], default='CLOSED', max_length=6)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('start', models.TimeField(blank=True, null=True)),
+                ('end', models.TimeField(blank=True, null=True)),
+                ('note', models.CharField(blank=True, max_length=100)),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='pages.specialist')),
+            ],
+            options={
+                'ordering': ['start_date', 'start'],
+                'indexes': [models.Index(fields=['specialist', 'end_date'], name='schedule_exception_idx')],
+            },
+            bases=(pages.models.ScheduleRangeMixin, models.Model),
+        ),
+    ]
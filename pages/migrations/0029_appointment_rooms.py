@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_room_exclusion(apps, schema_editor):
+    # A room, like a specialist, holds one booking at a time (btree_gist was enabled in 0022)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE pages_appointment ADD CONSTRAINT appointment_room_no_overlap '
+        'EXCLUDE USING gist (room_id WITH =, tsrange(date + time, date + end_time) WITH &&) '
+        "WHERE (room_id IS NOT NULL AND status NOT IN ('EXPIRED', 'CANCELLED'))"
+    )
+
+
+def drop_room_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE pages_appointment DROP CONSTRAINT IF EXISTS appointment_room_no_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0028_specialist_schedules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to='pages.room'),
+        ),
+        migrations.AddField(
+            model_name='specialist',
+            name='room_type',
+            field=models.CharField(blank=True, choices=[('SMALL', 'Small'), ('MEDIUM', 'Medium'), ('LARGE', 'Large')], max_length=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['room', 'date', 'time'], name='appointment_room_slot_idx'),
+        ),
+        migrations.AddField(
+            model_name='roomday',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_days', to='pages.room'),
+        ),
+        migrations.AddConstraint(
+            model_name='roomday',
+            constraint=models.UniqueConstraint(fields=('room', 'date'), name='room_day_unique'),
+        ),
+        migrations.RunPython(add_room_exclusion, drop_room_exclusion),
+    ]
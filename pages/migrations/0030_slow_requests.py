@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0029_appointment_rooms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('sampled', models.BooleanField(default=False)),
+                ('queries', models.PositiveIntegerField(blank=True, null=True)),
+                ('sql_ms', models.FloatField(blank=True, null=True)),
+                ('duplicate_queries', models.PositiveIntegerField(blank=True, null=True)),
+                ('template_ms', models.FloatField(blank=True, null=True)),
+                ('external_ms', models.FloatField(blank=True, null=True)),
+                ('top_duplicate', models.TextField(blank=True, help_text='The most repeated SQL statement, if any ran twice.')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def normalise_cancellations(apps, schema_editor):
+    # cancel_appointment used to store 'Cancelled', which no query treated as freeing the slot.
+    # Databases migrated through 0022 after its cleanup step was added have none left.
+    Appointment = apps.get_model('pages', 'Appointment')
+    Appointment.objects.filter(status__iexact='cancelled').update(status='CANCELLED', hold_expires_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0030_slow_requests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('EXPIRED', 'Expired'), ('CANCELLED', 'Cancelled')], max_length=10),
+        ),
+        migrations.RunPython(normalise_cancellations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def _replace_exclusions(schema_editor, released):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE pages_appointment DROP CONSTRAINT IF EXISTS appointment_no_overlap')
+    schema_editor.execute(
+        'ALTER TABLE pages_appointment ADD CONSTRAINT appointment_no_overlap '
+        'EXCLUDE USING gist (specialist_id WITH =, tsrange(date + time, date + end_time) WITH &&) '
+        f"WHERE (status NOT IN ({released}))"
+    )
+    schema_editor.execute('ALTER TABLE pages_appointment DROP CONSTRAINT IF EXISTS appointment_room_no_overlap')
+    schema_editor.execute(
+        'ALTER TABLE pages_appointment ADD CONSTRAINT appointment_room_no_overlap '
+        'EXCLUDE USING gist (room_id WITH =, tsrange(date + time, date + end_time) WITH &&) '
+        f"WHERE (room_id IS NOT NULL AND status NOT IN ({released}))"
+    )
+
+
+def exempt_cancellations(apps, schema_editor):
+    # Cancelled appointments, like expired holds, must not stop their slot being booked again. 0022,
+    # 0026 and 0029 now build the constraints this way; this brings databases migrated before that in line.
+    _replace_exclusions(schema_editor, "'EXPIRED', 'CANCELLED'")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0031_appointment_cancelled_status'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='appointment_unique_start',
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('EXPIRED', 'CANCELLED')), _negated=True), fields=('specialist', 'date', 'time'), name='appointment_unique_start'),
+        ),
+        migrations.RunPython(exempt_cancellations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0032_release_cancelled_slots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentpayment',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed'), ('REFUNDED', 'Refunded')], default='PENDING', max_length=10),
+        ),
+    ]
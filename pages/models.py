@@ -41,6 +41,11 @@ class ContactUs(models.Model):
 class CustomUser(AbstractUser):
     phone_number = models.CharField(max_length=15, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['email'], name='customuser_email_idx'),  # Login by email
+        ]
+
     def clean(self):
         super().clean()
         if self.phone_number and len(self.phone_number) < 11:
@@ -76,6 +81,11 @@ class Room(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_room_type_display()})"
 
+    @classmethod
+    def size_rank(cls, room_type):
+        """Position of ``room_type`` from smallest (0) to largest."""
+        return [value for value, _ in cls.ROOM_TYPES].index(room_type)
+
 from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
@@ -88,6 +98,8 @@ def get_default_user():
     return None  # Or return a default user ID if necessary
 
 from datetime import timedelta, datetime
+from django.utils import timezone
+from .scheduling import appointment_window, validate_slot
 
 class Specialist(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=False, blank=False)
@@ -96,6 +108,7 @@ class Specialist(models.Model):
     SPECIALTY_CHOICES = [
         ('Beauticians', 'Beauticians'),
         ('hairdresser', 'Hairdresser'),
+        ('barber', 'Barber'),
         ('tattoo_artist', 'Tattoo Artist'),
         ('nail_technician', 'Nail Technician'),
         ('dog_groomer', 'Dog Groomer'),
@@ -106,37 +119,233 @@ class Specialist(models.Model):
         ('semi_permanent_makeup', 'Semi-Permanent Makeup Artist'),
     ]
     
-    specialty = models.CharField(max_length=100, choices=SPECIALTY_CHOICES)
+    specialty = models.CharField(max_length=100, choices=SPECIALTY_CHOICES, db_index=True)
     email = models.EmailField()
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     availability_start = models.TimeField()  # e.g., 09:00
     availability_end = models.TimeField()    # e.g., 17:00
     is_active = models.BooleanField(default=True)
     session_price = models.DecimalField(max_digits=6, decimal_places=2, default=50.00)
+    # Smallest room the specialist works in; appointments are assigned one automatically. Empty: no room needed.
+    room_type = models.CharField(max_length=10, choices=Room.ROOM_TYPES, null=True, blank=True)
 
     def __str__(self):
         return f"{self.name} - {self.get_specialty_display()}"
 
+WEEKDAY_CHOICES = [
+    (0, 'Monday'),
+    (1, 'Tuesday'),
+    (2, 'Wednesday'),
+    (3, 'Thursday'),
+    (4, 'Friday'),
+    (5, 'Saturday'),
+    (6, 'Sunday'),
+]
+
+
+class ScheduleRangeMixin:
+    """Shared validation for the schedule models' ``start``/``end`` pair."""
+
+    def clean(self):
+        if self.start is not None and self.end is not None and self.end <= self.start:
+            raise ValidationError("The end time must be after the start time.")
+        return super().clean()
+
+
+class WorkingHours(ScheduleRangeMixin, models.Model):
+    """
+    Weekly working hours; several rows per weekday make a split shift.
+
+    A specialist with no rows at all works ``availability_start``-``availability_end`` every day.
+    """
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='working_hours')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start = models.TimeField()
+    end = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start']
+        verbose_name_plural = 'working hours'
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start}-{self.end}"
+
+
+class ScheduleBreak(ScheduleRangeMixin, models.Model):
+    """A recurring break, e.g. lunch, on one weekday or (with no weekday) every day."""
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='schedule_breaks')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True)
+    start = models.TimeField()
+    end = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start']
+
+    def __str__(self):
+        day = self.get_weekday_display() if self.weekday is not None else 'Daily'
+        return f"{day} break {self.start}-{self.end}"
+
+
+class ScheduleException(ScheduleRangeMixin, models.Model):
+    """
+    A one-off change for a date range (inclusive).
+
+    CLOSED without times is a holiday; CLOSED with times blocks that part of
+    the day. OPEN rows replace the weekly hours (and breaks) for those dates.
+    """
+    KIND_CHOICES = [
+        ('CLOSED', 'Closed'),
+        ('OPEN', 'Open (override hours)'),
+    ]
+
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='schedule_exceptions')
+    kind = models.CharField(max_length=6, choices=KIND_CHOICES, default='CLOSED')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    start = models.TimeField(null=True, blank=True)
+    end = models.TimeField(null=True, blank=True)
+    note = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['start_date', 'start']
+        indexes = [
+            models.Index(fields=['specialist', 'end_date'], name='schedule_exception_idx'),
+        ]
+
+    def __str__(self):
+        hours = f" {self.start}-{self.end}" if self.start else ''
+        return f"{self.get_kind_display()} {self.start_date} to {self.end_date}{hours}"
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError("The end date must not be before the start date.")
+        if (self.start is None) != (self.end is None):
+            raise ValidationError("Give both a start and an end time, or neither.")
+        if self.kind == 'OPEN' and self.start is None:
+            raise ValidationError("Override hours need a start and an end time.")
+        return super().clean()
+
+
+# Appointments in these states no longer hold their slot
+RELEASED_STATUSES = ('EXPIRED', 'CANCELLED')
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Columns the appointment list templates read, with specialist, client and latest payment status joined in."""
+        latest_payment = AppointmentPayment.objects.filter(appointment=models.OuterRef('pk')).order_by('-id')
+        return self.select_related('specialist', 'user').only(
+            'id', 'date', 'time', 'duration', 'status',
+            'specialist__id', 'specialist__name', 'specialist__specialty',
+            'user__id', 'user__username',
+        ).annotate(
+            latest_payment_status=models.Subquery(latest_payment.values('status')[:1]),
+        ).order_by('date', 'time', 'id')
+
+    def occupying(self, now=None):
+        """Appointments that still block their slot: everything except cancellations and expired or lapsed holds."""
+        return self.exclude(status__in=RELEASED_STATUSES).exclude(hold_expires_at__lte=now or timezone.now())
+
+    def lapsed_holds(self, now=None):
+        """Unpaid PENDING appointments whose hold has run out but which the reaper has not expired yet."""
+        return self.filter(status='PENDING', hold_expires_at__lte=now or timezone.now())
+
+
+class AppointmentSeries(models.Model):
+    """A recurring booking: the same slot every week or fortnight, for N sessions or until a date."""
+    FREQUENCY_CHOICES = [
+        ('WEEKLY', 'Weekly'),
+        ('FORTNIGHTLY', 'Fortnightly'),
+    ]
+    FREQUENCY_DAYS = {'WEEKLY': 7, 'FORTNIGHTLY': 14}
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE)
+    start_date = models.DateField()
+    time = models.TimeField()
+    duration = models.DurationField(default=timedelta(hours=1))
+    frequency = models.CharField(max_length=11, choices=FREQUENCY_CHOICES, default='WEEKLY')
+    occurrences = models.PositiveIntegerField(null=True, blank=True)  # Either this...
+    until = models.DateField(null=True, blank=True)  # ...or this (inclusive)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'appointment series'
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} with {self.specialist.name} from {self.start_date} at {self.time}"
+
+    def dates(self):
+        """Every occurrence date, capped at SERIES_MAX_OCCURRENCES."""
+        step = timedelta(days=self.FREQUENCY_DAYS[self.frequency])
+        limit = min(self.occurrences or settings.SERIES_MAX_OCCURRENCES, settings.SERIES_MAX_OCCURRENCES)
+        dates = []
+        date = self.start_date
+        while len(dates) < limit and (self.until is None or date <= self.until):
+            dates.append(date)
+            date += step
+        return dates
+
+
 class Appointment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE)
     date = models.DateField()  # Stores the date of the appointment
     time = models.TimeField()  # Stores the time of the appointment
     duration = models.DurationField(default=timedelta(hours=1))  # Stores the duration of the appointment with a default of 1 hour
-    status = models.CharField(max_length=10, choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed')])
+    end_time = models.TimeField(editable=False)  # Derived from time + duration in save(), used by the overlap query
+    status = models.CharField(max_length=10, choices=[
+        ('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('EXPIRED', 'Expired'), ('CANCELLED', 'Cancelled'),
+    ])
+    # Set for unpaid bookings; once it passes the slot is free again and `expire_holds` marks the row EXPIRED
+    hold_expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+    series = models.ForeignKey(AppointmentSeries, on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+    room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['specialist', 'date', 'time'], name='appointment_slot_idx'),
+            models.Index(fields=['user', 'date', 'time'], name='appointment_user_date_idx'),
+            models.Index(fields=['status', 'hold_expires_at'], name='appointment_hold_idx'),
+            models.Index(fields=['room', 'date', 'time'], name='appointment_room_slot_idx'),
+        ]
+        constraints = [
+            # Portable backstop against two bookings starting at the same moment; PostgreSQL
+            # additionally gets full overlap exclusion constraints per specialist (migrations 0022
+            # and 0026) and per room (0029), both updated in 0032. Expired holds and cancellations
+            # are exempt so their slots can be booked again.
+            models.UniqueConstraint(fields=['specialist', 'date', 'time'],
+                                    condition=~models.Q(status__in=RELEASED_STATUSES),
+                                    name='appointment_unique_start'),
+        ]
 
     def __str__(self):
         return f"Appointment with {self.specialist.name} on {self.date} at {self.time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the original day so amending a date invalidates both cached days
+        instance._loaded_slot = (instance.__dict__.get('specialist_id'), instance.__dict__.get('date'))
+        return instance
+
     @property
     def total_price(self):
         return self.specialist.session_price
 
     @property
-    def end_time(self):
-        start_datetime = datetime.combine(self.date, self.time)
-        end_datetime = start_datetime + self.duration
-        return end_datetime.time()
+    def payment_status(self):
+        """The latest payment attempt's status, e.g. "Succeeded", or "Not paid". Annotated by ``for_listing()``."""
+        if hasattr(self, 'latest_payment_status'):
+            status = self.latest_payment_status
+        else:
+            status = self.payments.order_by('-id').values_list('status', flat=True).first()
+        return dict(AppointmentPayment.STATUS_CHOICES).get(status, "Not paid")
+
+    def _slot_key(self):
+        return (self.specialist_id, self.date, self.time, self.duration)
 
     def clean(self):
         if self.time is None:
@@ -146,33 +355,73 @@ class Appointment(models.Model):
         if isinstance(self.duration, str):  
             self.duration = timedelta(minutes=int(self.duration))  
 
-        # Calculate appointment start and end times
-        start_datetime = datetime.combine(self.date, self.time)
-        end_datetime = start_datetime + self.duration
+        # AppointmentForm.clean() already ran the same check for these values
+        if getattr(self, '_validated_slot', None) != self._slot_key():
+            validate_slot(self.specialist, self.date, self.time, self.duration, exclude_id=self.id, room=self.room)
 
-        # Ensure the appointment is within specialist's available hours
-        availability_start = datetime.combine(self.date, self.specialist.availability_start)
-        availability_end = datetime.combine(self.date, self.specialist.availability_end)
+        return super().clean()
 
-        if start_datetime < availability_start or end_datetime > availability_end:
-            raise ValidationError(f"Appointment must be within the specialist's available hours: {self.specialist.availability_start} to {self.specialist.availability_end}.")
+    def save(self, *args, **kwargs):
+        if isinstance(self.duration, str):
+            self.duration = timedelta(minutes=int(self.duration))
+        self.end_time = appointment_window(self.date, self.time, self.duration)[1].time()
+        super().save(*args, **kwargs)
+    
+class SpecialistDay(models.Model):
+    """
+    One row per specialist per booked day, locked by ``scheduling.book()``.
 
-        # Check for overlapping appointments
-        overlapping_appointments = Appointment.objects.filter(
-            specialist=self.specialist,
-            date=self.date
-        ).exclude(id=self.id)  # Exclude itself when editing
+    Bookings for the same specialist and day serialise on this row, so the
+    overlap check and the insert cannot interleave; other days are unaffected.
+    """
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name='booking_days')
+    date = models.DateField()
+    version = models.PositiveIntegerField(default=0)  # Bumped by every booking taken under the lock
 
-        for existing_appointment in overlapping_appointments:
-            existing_start = datetime.combine(existing_appointment.date, existing_appointment.time)
-            existing_end = existing_start + existing_appointment.duration
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['specialist', 'date'], name='specialist_day_unique'),
+        ]
 
-            # Overlapping check: new appointment should not start before an existing one ends and vice versa
-            if start_datetime < existing_end and end_datetime > existing_start:
-                raise ValidationError("This time slot is already booked.")
+    def __str__(self):
+        return f"{self.specialist_id} on {self.date} (v{self.version})"
+
+class RoomDay(models.Model):
+    """Per-room, per-day lock row; claims on a room serialise here, as bookings do on ``SpecialistDay``."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='booking_days')
+    date = models.DateField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'date'], name='room_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} on {self.date} (v{self.version})"
+
+class AppointmentPayment(models.Model):
+    """A Stripe PaymentIntent for an appointment; confirmed by the Stripe webhook."""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),  # The intent was cancelled; a new attempt gets a new one
+        ('REFUNDED', 'Refunded'),
+    ]
+
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='payments')
+    idempotency_key = models.CharField(max_length=64, unique=True)  # Reused on retries so Stripe returns the same intent
+    stripe_payment_intent_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    client_secret = models.CharField(max_length=255, blank=True)
+    amount = models.PositiveIntegerField()  # In pence
+    currency = models.CharField(max_length=3, default='gbp')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Payment {self.stripe_payment_intent_id or self.idempotency_key} ({self.status})"
 
-        return super().clean()
-    
 import random
 import string
 from django.utils import timezone
@@ -183,7 +432,7 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     
     # Reset token fields
-    reset_token = models.CharField(max_length=6, null=True, blank=True)
+    reset_token = models.CharField(max_length=6, null=True, blank=True, db_index=True)
     reset_token_expiry = models.DateTimeField(null=True, blank=True)
     SPECIALTY_CHOICES = [
         ('Beauticians', 'Beauticians'),
@@ -218,4 +467,56 @@ class UserProfile(models.Model):
         """Clears the reset token after use."""
         self.reset_token = None
         self.reset_token_expiry = None
-        self.save()
\ No newline at end of file
+        self.save()
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox for the ``send_queued_email`` worker."""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()  # List of recipient addresses
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
+
+
+class SlowRequest(models.Model):
+    """A request slower than ``PROFILING_SLOW_REQUEST_MS``, kept by ``RequestProfilingMiddleware``."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    username = models.CharField(max_length=150, blank=True)
+    # Only sampled requests have the breakdown
+    sampled = models.BooleanField(default=False)
+    queries = models.PositiveIntegerField(null=True, blank=True)
+    sql_ms = models.FloatField(null=True, blank=True)
+    duplicate_queries = models.PositiveIntegerField(null=True, blank=True)
+    template_ms = models.FloatField(null=True, blank=True)
+    external_ms = models.FloatField(null=True, blank=True)
+    top_duplicate = models.TextField(blank=True, help_text="The most repeated SQL statement, if any ran twice.")
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
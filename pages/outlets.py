@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .availability import free_slots
+from .models import Specialist
+
+
+@dataclass(frozen=True)
+class Outlet:
+    slug: str
+    path: str  # URL path, kept from the original per-outlet routes
+    url_name: str  # Name used by {% url %} in base.html
+    title: str
+    template: str
+    specialties: tuple
+
+
+# Single source of truth for the outlet pages; add a row here to add a page
+OUTLETS = {outlet.slug: outlet for outlet in [
+    Outlet('tattooist', 'Tatooist', 'Tatoo', 'Tattooist', 'outlets/Tatooist.html', ('tattoo_artist',)),
+    Outlet('barber', 'Barber', 'Barber', 'Barber', 'outlets/barber.html', ('barber',)),
+    Outlet('therapist', 'Therapist', 'Therapist', 'Therapist', 'outlets/therapist.html', ('sports_therapist',)),
+    Outlet('hairdresser', 'Hairdresser', 'Hairdresser', 'Hairdresser', 'outlets/hairdresser.html', ('hairdresser',)),
+    Outlet('nailtech', 'NailTech', 'NailTech', 'Nail Technician', 'outlets/nailtech.html', ('nail_technician',)),
+    Outlet('doggroomer', 'DogGroomer', 'DogGroomer', 'Dog Groomer', 'outlets/doggroomer.html', ('dog_groomer',)),
+    Outlet('chiropractor', 'Chiropractor', 'Chiropractor', 'Chiropractor', 'outlets/chiropractor.html', ('chiropractor',)),
+    Outlet('physiotherapist', 'Physiotherapist', 'Physiotherapist', 'Physiotherapist', 'outlets/physiotherapist.html', ('physiotherapist',)),
+]}
+
+
+def next_free_slots(specialists, minutes, horizon_days):
+    """
+    ``{specialist_id: datetime or None}``: the earliest start with ``minutes`` free.
+
+    Built on ``free_slots()``, so the whole horizon for every specialist
+    costs at most one Appointment query.
+    """
+    now = timezone.localtime().replace(tzinfo=None, second=0, microsecond=0)
+    length = timedelta(minutes=minutes)
+    slots = free_slots(specialists, now.date(), now.date() + timedelta(days=horizon_days - 1))
+
+    result = {}
+    for specialist in specialists:
+        result[specialist.id] = None
+        for date in sorted(slots[specialist.id]):
+            for start, end in slots[specialist.id][date]:
+                start_at = max(datetime.combine(date, start), now)
+                if datetime.combine(date, end) - start_at >= length:
+                    result[specialist.id] = start_at
+                    break
+            if result[specialist.id]:
+                break
+    return result
+
+
+def outlet_specialists(outlet):
+    """Active specialists for an outlet with their next free slot, cached for OUTLET_SPECIALISTS_CACHE_TIMEOUT."""
+    key = f"outlet_specialists:{outlet.slug}"
+    specialists = cache.get(key)
+    if specialists is None:
+        rows = list(Specialist.objects.filter(specialty__in=outlet.specialties, is_active=True).only(
+            'id', 'name', 'specialty', 'session_price', 'availability_start', 'availability_end', 'room_type',
+        ).order_by('name'))
+        next_slots = next_free_slots(rows, settings.OUTLET_SLOT_MINUTES, settings.OUTLET_HORIZON_DAYS)
+        specialists = [
+            {
+                'id': specialist.id,
+                'name': specialist.name,
+                'specialty': specialist.get_specialty_display(),
+                'session_price': specialist.session_price,
+                'next_slot': next_slots[specialist.id],
+            }
+            for specialist in rows
+        ]
+        cache.set(key, specialists, settings.OUTLET_SPECIALISTS_CACHE_TIMEOUT)
+    return specialists
@@ -0,0 +1,108 @@
+import base64
+from dataclasses import dataclass
+from datetime import date as date_cls, time as time_cls
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = None
+    previous_cursor: str = None
+
+
+def encode_cursor(appointment):
+    raw = f"{appointment.date.isoformat()}|{appointment.time.isoformat()}|{appointment.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (date, time, id) seek key; raises ``ValueError`` on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, time, pk = raw.split('|')
+        return date_cls.fromisoformat(date), time_cls.fromisoformat(time), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def _after(date, time, pk):
+    return Q(date__gt=date) | Q(date=date, time__gt=time) | Q(date=date, time=time, id__gt=pk)
+
+
+def _before(date, time, pk):
+    return Q(date__lt=date) | Q(date=date, time__lt=time) | Q(date=date, time=time, id__lt=pk)
+
+
+def keyset_paginate(queryset, limit, after=None, before=None):
+    """
+    Seek-paginate ``queryset`` on (date, time, id).
+
+    Each page is one ``LIMIT limit + 1`` query starting from the cursor, so
+    the cost stays flat no matter how deep into the history the page is.
+    """
+    if before:
+        rows = list(queryset.filter(_before(*decode_cursor(before))).order_by('-date', '-time', '-id')[:limit + 1])
+        has_more = len(rows) > limit
+        items = rows[:limit][::-1]
+        return KeysetPage(
+            items=items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if items and has_more else None,
+        )
+
+    if after:
+        queryset = queryset.filter(_after(*decode_cursor(after)))
+    rows = list(queryset.order_by('date', 'time', 'id')[:limit + 1])
+    items = rows[:limit]
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1]) if len(rows) > limit else None,
+        previous_cursor=encode_cursor(items[0]) if items and after else None,
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination over ``keyset_paginate()``: ``?after=``/``?before=`` cursors on (date, time, id).
+
+    Responses are ``{"next": url, "previous": url, "results": [...]}``, as
+    with DRF's own cursor pagination.
+    """
+    page_size_setting = 'APPOINTMENTS_PAGE_SIZE'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            self.page = keyset_paginate(
+                queryset,
+                getattr(settings, self.page_size_setting),
+                after=request.query_params.get('after'),
+                before=request.query_params.get('before'),
+            )
+        except ValueError as e:
+            raise ValidationError({'cursor': [str(e)]})
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'before')
+        self.base_url = remove_query_param(self.base_url, 'after')
+        return self.page.items
+
+    def _link(self, param, cursor):
+        return replace_query_param(self.base_url, param, cursor) if cursor else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link('after', self.page.next_cursor),
+            'previous': self._link('before', self.page.previous_cursor),
+            'results': data,
+        })
+
+
+class IdCursorPagination(CursorPagination):
+    """DRF cursor pagination on the primary key, for lists with no natural (date, time) order."""
+    ordering = 'id'
+    page_size = settings.APPOINTMENTS_PAGE_SIZE
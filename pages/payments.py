@@ -0,0 +1,126 @@
+import logging
+
+import stripe
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import Appointment, AppointmentPayment
+from .profiling import external_call
+from .scheduling import book, refresh_series_holds
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+if settings.STRIPE_API_BASE:
+    stripe.api_base = settings.STRIPE_API_BASE  # e.g. `python manage.py stripe_stub`
+
+
+def get_or_create_payment(appointment):
+    """
+    Return the pending ``AppointmentPayment`` for ``appointment``, creating its PaymentIntent once.
+
+    The idempotency key depends only on the appointment, amount and attempt,
+    so refreshes, double clicks and concurrent requests all map to one row and
+    one Stripe PaymentIntent. A declined card leaves the intent open for
+    another try, so it is reused; only once an intent has been cancelled
+    (payment FAILED) does the next call start a new attempt with a new intent.
+    """
+    amount = int(appointment.total_price * 100)  # Stripe amounts are in pence
+    key = f"appointment-{appointment.id}-{amount}"
+    failed = appointment.payments.filter(amount=amount, status='FAILED').count()
+    if failed:
+        key += f"-retry{failed}"
+
+    try:
+        payment, _ = AppointmentPayment.objects.get_or_create(
+            idempotency_key=key,
+            defaults={'appointment': appointment, 'amount': amount},
+        )
+    except IntegrityError:
+        # Lost a race with a concurrent request for the same appointment
+        payment = AppointmentPayment.objects.get(idempotency_key=key)
+
+    if not payment.stripe_payment_intent_id:
+        with external_call():
+            intent = stripe.PaymentIntent.create(
+                amount=amount,
+                currency=payment.currency,
+                description=f"Appointment with {appointment.specialist.name} on {appointment.date} at {appointment.time}",
+                metadata={'appointment_id': appointment.id},
+                idempotency_key=key,
+            )
+        payment.stripe_payment_intent_id = intent.id
+        payment.client_secret = intent.client_secret
+        payment.save(update_fields=['stripe_payment_intent_id', 'client_secret', 'updated_at'])
+
+    return payment
+
+
+def refund_payment(payment, reason):
+    """Refund a payment that must not stand (a second charge, or no slot to give for it). Never inside atomic()."""
+    try:
+        with external_call():
+            stripe.Refund.create(payment_intent=payment.stripe_payment_intent_id,
+                                 idempotency_key=f"refund-{payment.stripe_payment_intent_id}")
+    except stripe.error.StripeError:
+        logger.exception("Could not refund PaymentIntent %s (%s); refund it by hand",
+                         payment.stripe_payment_intent_id, reason)
+        return
+    AppointmentPayment.objects.filter(id=payment.id).update(status='REFUNDED')
+    logger.warning("Refunded PaymentIntent %s for appointment %s: %s",
+                   payment.stripe_payment_intent_id, payment.appointment_id, reason)
+
+
+def handle_stripe_event(event):
+    """
+    Apply a verified webhook event. Safe to receive more than once.
+
+    ``payment_intent.succeeded`` confirms the appointment if its slot is still
+    free, and holds the rest of its series for ``SERIES_HOLD_SECONDS``; a payment for an appointment that is cancelled, already paid or has
+    lost its slot is refunded instead. A cancelled intent marks the payment
+    FAILED so the client's next try gets a new one. ``payment_failed`` changes
+    nothing: the intent can still be confirmed with another card.
+    """
+    if event['type'] == 'payment_intent.succeeded':
+        status = 'SUCCEEDED'
+    elif event['type'] == 'payment_intent.canceled':
+        status = 'FAILED'
+    else:
+        return
+
+    intent_id = event['data']['object']['id']
+    refund = None
+    with transaction.atomic():
+        payment = AppointmentPayment.objects.select_for_update().filter(stripe_payment_intent_id=intent_id).first()
+        if payment is None:
+            logger.warning("Stripe event %s for unknown PaymentIntent %s", event['id'], intent_id)
+            return
+        if payment.status in ('SUCCEEDED', 'REFUNDED'):
+            return  # Never downgrade a settled payment on a late or duplicate event
+
+        payment.status = status
+        payment.save(update_fields=['status', 'updated_at'])
+        if status == 'SUCCEEDED':
+            appointment = Appointment.objects.select_related('specialist').select_for_update(of=('self',)).get(
+                id=payment.appointment_id)
+            paid_before = appointment.payments.filter(status='SUCCEEDED').exclude(id=payment.id).exists()
+            if paid_before:
+                refund = "the appointment was already paid for"
+            elif appointment.status == 'CANCELLED':
+                refund = "the appointment was cancelled"
+            else:
+                appointment.status = 'CONFIRMED'
+                appointment.hold_expires_at = None
+                try:
+                    # The hold may have lapsed before payment and the slot been booked by someone else
+                    book(appointment)
+                except ValidationError:
+                    refund = "the appointment lost its slot"
+                else:
+                    if appointment.series_id:
+                        # Paying one session commits to the series: keep the unpaid ones while the client pays them
+                        refresh_series_holds(appointment.series_id, settings.SERIES_HOLD_SECONDS)
+
+    if refund:
+        refund_payment(payment, refund)
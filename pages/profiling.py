@@ -0,0 +1,230 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being handled, if it was sampled. A context variable rather than a
+# thread-local so it follows sync views run in a thread under ASGI.
+current_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """What one sampled request spent on SQL, templates and external services."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.statements = Counter()  # SQL text without parameters: repeats are N+1 candidates
+        self.template_ms = 0.0
+        self.external_calls = 0
+        self.external_ms = 0.0
+
+    @property
+    def duplicate_queries(self):
+        return sum(count - 1 for count in self.statements.values())
+
+    @property
+    def top_duplicate(self):
+        """The most repeated statement, or ``''`` when nothing ran twice."""
+        if not self.statements:
+            return ''
+        sql, count = self.statements.most_common(1)[0]
+        return sql if count > 1 else ''
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper installed on every connection; times queries of sampled requests.
+
+    Outside a sampled request it costs one context variable lookup.
+    """
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_ms += (time.perf_counter() - started) * 1000
+        profile.queries += 1
+        profile.statements[sql] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """``connection_created`` receiver: keep ``record_query`` on the connection for its lifetime."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def external_call():
+    """Count the time inside the block as a call to an external service (Stripe, Mailgun)."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.external_ms += (time.perf_counter() - started) * 1000
+        profile.external_calls += 1
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_ms += (time.perf_counter() - started) * 1000
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing top-level renders of sampled requests ({% include %}s count once)."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class RequestProfilingMiddleware:
+    """
+    Measure a sample of requests and keep a log of slow ones.
+
+    Every request is timed as a whole; only a ``PROFILING_SAMPLE_RATE``
+    fraction also has its queries, duplicate statements, template rendering
+    and external calls measured. Sampled requests get a ``Server-Timing``
+    header (when ``PROFILING_SERVER_TIMING`` is on, or for staff) and a
+    structured log line. Requests slower than ``PROFILING_SLOW_REQUEST_MS``,
+    sampled or not, are logged as warnings and kept in ``SlowRequest``, which
+    holds the latest ``PROFILING_SLOW_LOG_SIZE`` of them.
+
+    For streaming responses (the dashboard event stream) only the time to
+    the first byte is measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_profile.reset(token)
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.finish(request, response, profile, duration_ms)
+        return response
+
+    async def __acall__(self, request):
+        profile, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_profile.reset(token)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if profile is not None or duration_ms >= settings.PROFILING_SLOW_REQUEST_MS:
+            await sync_to_async(self.finish)(request, response, profile, duration_ms)
+        return response
+
+    def start(self):
+        profile = token = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profile = RequestProfile()
+            token = current_profile.set(profile)
+        return profile, token, time.perf_counter()
+
+    def finish(self, request, response, profile, duration_ms):
+        slow = duration_ms >= settings.PROFILING_SLOW_REQUEST_MS
+        if profile is None and not slow:
+            return
+        if profile is not None and self.show_server_timing(request):
+            response['Server-Timing'] = server_timing(profile, duration_ms)
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'sampled': profile is not None,
+        }
+        if profile is not None:
+            fields.update(
+                queries=profile.queries, sql_ms=round(profile.sql_ms, 1), duplicate_queries=profile.duplicate_queries,
+                template_ms=round(profile.template_ms, 1), external_calls=profile.external_calls,
+                external_ms=round(profile.external_ms, 1),
+            )
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "%s %s %s in %.1f ms (%s queries, %s duplicate)",
+            request.method, request.path, response.status_code, duration_ms,
+            fields.get('queries', '?'), fields.get('duplicate_queries', '?'),
+            extra={'request_profile': fields},
+        )
+        if slow:
+            record_slow_request(request, fields, profile)
+
+    def show_server_timing(self, request):
+        if settings.PROFILING_SERVER_TIMING:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+
+def server_timing(profile, duration_ms):
+    return ', '.join([
+        f'sql;dur={profile.sql_ms:.1f};desc="{profile.queries} queries, {profile.duplicate_queries} duplicate"',
+        f'tpl;dur={profile.template_ms:.1f}',
+        f'ext;dur={profile.external_ms:.1f};desc="{profile.external_calls} calls"',
+        f'total;dur={duration_ms:.1f}',
+    ])
+
+
+def record_slow_request(request, fields, profile):
+    """Add a ``SlowRequest`` row and drop those older than the newest ``PROFILING_SLOW_LOG_SIZE``."""
+    from .models import SlowRequest
+
+    user = getattr(request, 'user', None)
+    try:
+        entry = SlowRequest.objects.create(
+            method=fields['method'],
+            path=fields['path'][:SlowRequest._meta.get_field('path').max_length],
+            status_code=fields['status'],
+            duration_ms=fields['duration_ms'],
+            sampled=fields['sampled'],
+            queries=fields.get('queries'),
+            sql_ms=fields.get('sql_ms'),
+            duplicate_queries=fields.get('duplicate_queries'),
+            template_ms=fields.get('template_ms'),
+            external_ms=fields.get('external_ms'),
+            top_duplicate=profile.top_duplicate if profile is not None else '',
+            username=user.get_username() if user is not None and user.is_authenticated else '',
+        )
+        SlowRequest.objects.filter(id__lte=entry.id - settings.PROFILING_SLOW_LOG_SIZE).delete()
+    except DatabaseError:
+        # The log must never break the response it describes
+        logger.exception("Could not record slow request %s %s", fields['method'], fields['path'])
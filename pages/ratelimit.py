@@ -0,0 +1,66 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+
+def get_cache():
+    """The cache holding rate-limit buckets (locmem by default; point RATELIMIT_CACHE_ALIAS at Redis in production)."""
+    return caches[settings.RATELIMIT_CACHE_ALIAS]
+
+
+def hashed(value):
+    """Cache-key-safe digest, so raw emails/usernames never end up in cache keys."""
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def take_token(key, rate, burst):
+    """
+    Token bucket: ``burst`` tokens, refilled at ``rate`` tokens per second.
+
+    Returns True and spends a token if one is available. The read-modify-write
+    is not atomic, so concurrent requests may occasionally get one extra token.
+    """
+    cache = get_cache()
+    now = time.time()
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    # Keep the bucket only as long as it takes to refill completely
+    cache.set(key, (tokens, now), timeout=int(burst / rate) + 1)
+    return allowed
+
+
+def ratelimit(scope, setting_prefix, identifier_param=None):
+    """
+    Limit a view per client IP and, with ``identifier_param``, per submitted identifier.
+
+    Rate and burst come from ``<setting_prefix>_RATE``/``<setting_prefix>_BURST``,
+    read per request. Over-limit requests get a 429 JSON response with
+    ``error_type: rate_limited``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            from .views import get_client_ip
+
+            rate = getattr(settings, f"{setting_prefix}_RATE")
+            burst = getattr(settings, f"{setting_prefix}_BURST")
+
+            keys = [f"ratelimit:{scope}:ip:{hashed(get_client_ip(request) or '')}"]
+            identifier = request.GET.get(identifier_param) if identifier_param else None
+            if identifier:
+                keys.append(f"ratelimit:{scope}:id:{hashed(identifier.lower())}")
+
+            if not all([take_token(key, rate, burst) for key in keys]):
+                response = JsonResponse({'valid': False, 'exists': False, 'error_type': 'rate_limited'}, status=429)
+                response['Retry-After'] = str(max(1, int(1 / rate)))
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,148 @@
+import math
+from dataclasses import dataclass, field
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .caching import bump_data_versions
+
+# Availability is a bitmap per day: bit i covers minutes [i * SCHEDULE_SLOT_MINUTES, (i + 1) * SCHEDULE_SLOT_MINUTES).
+# Working hours are rounded inwards and bookings outwards, so a slot is only free if all of it is.
+
+
+def _slot_minutes():
+    return settings.SCHEDULE_SLOT_MINUTES
+
+
+def _minute(value):
+    return value.hour * 60 + value.minute + value.second / 60 + value.microsecond / 60_000_000
+
+
+def range_mask(start, end, inward=False):
+    """Bits covering [start, end): every touched slot, or with ``inward`` only slots fully inside."""
+    slot = _slot_minutes()
+    first, last = _minute(start) / slot, _minute(end) / slot
+    if inward:
+        low, high = math.ceil(first), math.floor(last)
+    else:
+        low, high = math.floor(first), math.ceil(last)
+    return ((1 << (high - low)) - 1) << low if high > low else 0
+
+
+def mask_intervals(mask):
+    """Turn a day bitmap back into ``[(start, end), ...]`` times (end of day is 23:59)."""
+    slot = _slot_minutes()
+    intervals = []
+    index = 0
+    while mask:
+        if mask & 1:
+            run = 0
+            while mask & 1:
+                mask >>= 1
+                run += 1
+            intervals.append((_time(index * slot), _time((index + run) * slot)))
+            index += run
+        else:
+            skip = (mask & -mask).bit_length() - 1  # Jump straight to the next set bit
+            mask >>= skip
+            index += skip
+    return intervals
+
+
+def _time(minutes):
+    return time(23, 59) if minutes >= 24 * 60 else time(minutes // 60, minutes % 60)
+
+
+def describe(mask):
+    """Human-readable hours for error messages, e.g. ``09:00-12:00, 13:00-17:00``."""
+    return ", ".join(f"{start:%H:%M}-{end:%H:%M}" for start, end in mask_intervals(mask))
+
+
+@dataclass
+class Schedule:
+    """A specialist's compiled working time: one mask per weekday plus per-date exceptions."""
+    weekly: tuple  # 7 masks, Monday first
+    dates: dict = field(default_factory=dict)  # {date: mask} where an exception applies
+
+    def mask(self, date):
+        return self.dates.get(date, self.weekly[date.weekday()])
+
+
+def _compile(specialist, hours, breaks, exceptions):
+    if hours:
+        weekly = [0] * 7
+        for weekday, start, end in hours:
+            weekly[weekday] |= range_mask(start, end, inward=True)
+    else:
+        weekly = [range_mask(specialist.availability_start, specialist.availability_end, inward=True)] * 7
+    for weekday, start, end in breaks:
+        blocked = range_mask(start, end)
+        for day in ([weekday] if weekday is not None else range(7)):
+            weekly[day] &= ~blocked
+
+    opened, closed = {}, {}
+    for kind, start_date, end_date, start, end in exceptions:
+        date = start_date
+        while date <= end_date:
+            if kind == 'OPEN':
+                opened[date] = opened.get(date, 0) | range_mask(start, end, inward=True)
+            else:
+                closed[date] = closed.get(date, 0) | (range_mask(start, end) if start else ~0)
+            date += timedelta(days=1)
+
+    dates = {}
+    for date in opened.keys() | closed.keys():
+        mask = opened[date] if date in opened else weekly[date.weekday()]
+        dates[date] = mask & ~closed.get(date, 0)
+    return Schedule(tuple(weekly), dates)
+
+
+def _cache_key(specialist_id):
+    return f"schedule:{_slot_minutes()}:{specialist_id}"  # Masks from another granularity are meaningless
+
+
+def schedules_for(specialists):
+    """
+    ``{specialist_id: Schedule}``, cached per specialist until its rules change.
+
+    All cache misses are compiled together from three queries.
+    """
+    from .models import ScheduleBreak, ScheduleException, WorkingHours
+
+    specialists = {specialist.id: specialist for specialist in specialists}
+    cached = cache.get_many([_cache_key(specialist_id) for specialist_id in specialists])
+    result = {specialist_id: cached[_cache_key(specialist_id)]
+              for specialist_id in specialists if _cache_key(specialist_id) in cached}
+
+    missing = [specialist_id for specialist_id in specialists if specialist_id not in result]
+    if missing:
+        rules = {specialist_id: ([], [], []) for specialist_id in missing}
+        for specialist_id, *row in WorkingHours.objects.filter(specialist_id__in=missing).values_list(
+                'specialist_id', 'weekday', 'start', 'end'):
+            rules[specialist_id][0].append(row)
+        for specialist_id, *row in ScheduleBreak.objects.filter(specialist_id__in=missing).values_list(
+                'specialist_id', 'weekday', 'start', 'end'):
+            rules[specialist_id][1].append(row)
+        # Exceptions that ended long ago cannot affect a booking, so keep the cached schedule small
+        recent = timezone.localdate() - timedelta(days=settings.SCHEDULE_EXCEPTION_HISTORY_DAYS)
+        for specialist_id, *row in ScheduleException.objects.filter(specialist_id__in=missing, end_date__gte=recent).values_list(
+                'specialist_id', 'kind', 'start_date', 'end_date', 'start', 'end'):
+            rules[specialist_id][2].append(row)
+
+        compiled = {specialist_id: _compile(specialists[specialist_id], *rules[specialist_id]) for specialist_id in missing}
+        cache.set_many({_cache_key(specialist_id): schedule for specialist_id, schedule in compiled.items()},
+                       settings.SCHEDULE_CACHE_TIMEOUT)
+        result.update(compiled)
+    return result
+
+
+def schedule_for(specialist):
+    return schedules_for([specialist])[specialist.id]
+
+
+def invalidate_schedule(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Specialist and its schedule rules."""
+    cache.delete(_cache_key(getattr(instance, 'specialist_id', instance.pk)))
+    bump_data_versions('specialists')
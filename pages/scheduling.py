@@ -0,0 +1,438 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .events import appointment_event, publish_appointment_events
+from .schedules import describe, range_mask, schedule_for
+
+
+def appointment_window(date, time, duration):
+    """Return the (start, end) datetimes an appointment occupies."""
+    if isinstance(duration, str):
+        duration = timedelta(minutes=int(duration))
+    start_datetime = datetime.combine(date, time)
+    return start_datetime, start_datetime + duration
+
+
+def overlapping_appointments(specialist, date, start_time, end_time, exclude_id=None, room=None):
+    """
+    Appointments for ``specialist`` (or, given ``room``, in that room) on ``date`` that intersect [start_time, end_time).
+
+    The overlap test runs as a single SQL predicate against the stored
+    ``time``/``end_time`` columns, served by the (specialist, date, time) and
+    (room, date, time) indexes. Expired and lapsed holds do not count.
+    """
+    from .models import Appointment
+
+    owner = Q(specialist=specialist)
+    if room is not None:
+        owner |= Q(room=room)
+    queryset = Appointment.objects.occupying().filter(
+        owner,
+        date=date,
+        time__lt=end_time,
+        end_time__gt=start_time,
+    )
+    if exclude_id is not None:
+        queryset = queryset.exclude(id=exclude_id)
+    return queryset
+
+
+def slot_mask(date, time, duration):
+    """The schedule bits an appointment covers, or ``None`` if it would run past midnight."""
+    start_datetime, end_datetime = appointment_window(date, time, duration)
+    if end_datetime.date() != date:
+        return None
+    return range_mask(start_datetime.time(), end_datetime.time())
+
+
+def outside_hours(specialist, date, working):
+    """The error for a slot outside ``working``, the specialist's compiled mask for ``date``."""
+    if not working:
+        return f"{specialist.name} is not working on {date:%d %b %Y}."
+    return f"Appointment must be within the specialist's available hours on {date:%d %b %Y}: {describe(working)}."
+
+
+def validate_slot(specialist, date, time, duration, exclude_id=None, room=None):
+    """
+    Raise ``ValidationError`` if the slot is outside the specialist's hours or already booked.
+
+    With ``room`` the specialist's and the room's bookings are checked in the
+    same query; a clash on the room alone raises with code ``room_taken``.
+    Shared by ``Appointment.clean()``, ``AppointmentForm.clean()`` and ``book()``.
+    """
+    start_datetime, end_datetime = appointment_window(date, time, duration)
+
+    # Working hours, breaks and exceptions are one cached bitmap per day
+    working = schedule_for(specialist).mask(date)
+    wanted = slot_mask(date, time, duration)
+    if wanted is None or wanted & ~working:
+        raise ValidationError(outside_hours(specialist, date, working))
+
+    clashes = overlapping_appointments(
+        specialist, date, start_datetime.time(), end_datetime.time(), exclude_id=exclude_id, room=room
+    )
+    if room is None:
+        if clashes.exists():
+            raise ValidationError("This time slot is already booked.")
+        return
+    # One row says whose booking is in the way; the specialist's own clash is reported first
+    owner = clashes.order_by(Case(When(specialist=specialist, then=0), default=1)).values_list(
+        'specialist_id', flat=True).first()
+    if owner == specialist.id:
+        raise ValidationError("This time slot is already booked.")
+    if owner is not None:
+        raise ValidationError("This room is already booked at that time.", code='room_taken')
+
+
+def _lock_day(model, date, **owner):
+    day = model.objects.filter(date=date, **owner)
+    if day.update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(date=date, version=1, **owner)
+    except IntegrityError:
+        # Another booking created the row first; wait for its lock like everyone else
+        day.update(version=F('version') + 1)
+
+
+def lock_specialist_day(specialist_id, date):
+    """
+    Take the booking lock for one specialist's day. Must run inside ``transaction.atomic()``.
+
+    The lock is an UPDATE of the ``SpecialistDay`` row: a row lock held until
+    commit on PostgreSQL/MySQL (as ``SELECT ... FOR UPDATE`` would be) and the
+    database write lock on SQLite, where ``select_for_update()`` is a no-op.
+    Issuing the write first also avoids SQLite's read-then-upgrade deadlock.
+    """
+    from .models import SpecialistDay
+
+    _lock_day(SpecialistDay, date, specialist_id=specialist_id)
+
+
+def lock_specialist_days(specialist_id, dates):
+    """
+    Take the booking locks for several of one specialist's days at once.
+
+    Missing rows are inserted and the rest locked in date order, so two series
+    over overlapping dates cannot deadlock; a few statements however many dates.
+    """
+    from .models import SpecialistDay
+
+    dates = sorted(set(dates))
+    SpecialistDay.objects.bulk_create(
+        [SpecialistDay(specialist_id=specialist_id, date=date) for date in dates], ignore_conflicts=True)
+    days = SpecialistDay.objects.filter(specialist_id=specialist_id, date__in=dates)
+    if connection.features.has_select_for_update:
+        list(days.select_for_update().order_by('date').values_list('id', flat=True))
+    days.update(version=F('version') + 1)
+
+
+def lock_room_days(room_ids, dates):
+    """
+    Lock every day in ``dates`` of each room in ``room_ids``, in (room, date) order.
+
+    Always taken after the specialist's day locks, and every caller locks in
+    the same order, so room locks cannot deadlock.
+    """
+    from .models import RoomDay
+
+    room_ids, dates = sorted(set(room_ids)), sorted(set(dates))
+    RoomDay.objects.bulk_create(
+        [RoomDay(room_id=room_id, date=date) for room_id in room_ids for date in dates], ignore_conflicts=True)
+    days = RoomDay.objects.filter(room_id__in=room_ids, date__in=dates)
+    if connection.features.has_select_for_update:
+        list(days.select_for_update().order_by('room_id', 'date').values_list('id', flat=True))
+    days.update(version=F('version') + 1)
+
+
+def _slack(booked, wanted):
+    """Free slots either side of ``wanted`` before the next booking in ``booked`` (or the end of the day)."""
+    low = (wanted & -wanted).bit_length() - 1
+    high = wanted.bit_length()
+    below = booked & ((1 << low) - 1)
+    before = low - below.bit_length()
+    above = booked >> high
+    after = (above & -above).bit_length() - 1 if above else 24 * 60 // settings.SCHEDULE_SLOT_MINUTES - high
+    return before + after
+
+
+def candidate_rooms(room_type):
+    """Rooms at least as large as ``room_type``."""
+    from .models import Room
+
+    types = [value for value, _ in Room.ROOM_TYPES][Room.size_rank(room_type):]
+    return list(Room.objects.filter(room_type__in=types).only('id', 'name', 'room_type', 'capacity'))
+
+
+def room_bookings(rooms, dates, exclude_id=None):
+    """``{(room_id, date): bitmap}`` of the occupied slots of ``rooms`` (instances or ids) on ``dates``, in one query."""
+    from .models import Appointment
+
+    booked = defaultdict(int)
+    rows = Appointment.objects.occupying().filter(room_id__in=[getattr(room, 'id', room) for room in rooms], date__in=dates)
+    if exclude_id is not None:
+        rows = rows.exclude(id=exclude_id)
+    for room_id, date, start, end in rows.values_list('room_id', 'date', 'time', 'end_time'):
+        booked[(room_id, date)] |= range_mask(start, end)
+    return booked
+
+
+def best_fit(rooms, booked, date, wanted):
+    """
+    The room in ``rooms`` free for ``wanted`` on ``date`` that fits best, or ``None``.
+
+    Smallest type first, then smallest capacity, then the tightest free gap
+    around the slot, so large rooms and long gaps stay available for the
+    bookings that need them.
+    """
+    from .models import Room
+
+    free = [room for room in rooms if wanted and not wanted & booked[(room.id, date)]]
+    return min(free, default=None, key=lambda room: (
+        Room.size_rank(room.room_type), room.capacity, _slack(booked[(room.id, date)], wanted), room.id))
+
+
+def allocate_rooms(specialist, dates, time, duration, exclude_id=None):
+    """
+    Pick the best-fitting free room for the slot on each of ``dates``: ``{date: Room or None}``.
+
+    Two queries however many dates: the candidate rooms, then their bookings.
+    """
+    rooms = candidate_rooms(specialist.room_type)
+    if not rooms:
+        return {date: None for date in dates}
+    booked = room_bookings(rooms, dates, exclude_id)
+    return {date: best_fit(rooms, booked, date, slot_mask(date, time, duration)) for date in dates}
+
+
+def _claim_room(appointment):
+    """
+    Assign ``appointment`` a free room under the room-day locks, then run the joint check.
+
+    The day of every candidate room is locked before one is chosen, in room
+    order with a single statement, so concurrent bookings never wait on each
+    other's rooms in opposite orders and the chosen room cannot be claimed
+    before commit. A room already assigned is kept if it is still free.
+    """
+    from .models import Appointment
+
+    rooms = candidate_rooms(appointment.specialist.room_type)
+    room_ids = {room.id for room in rooms} | ({appointment.room_id} if appointment.room_id is not None else set())
+    if not room_ids:
+        raise ValidationError("No suitable room is free at that time.", code='no_room')
+    lock_room_days(room_ids, [appointment.date])
+    # Another specialist's lapsed hold would still trip the room's database constraint
+    expire_holds(Appointment.objects.filter(room_id__in=room_ids, date=appointment.date))
+
+    if appointment.room_id is not None:
+        try:
+            validate_slot(appointment.specialist, appointment.date, appointment.time, appointment.duration,
+                          exclude_id=appointment.id, room=appointment.room)
+            return
+        except ValidationError as e:
+            if e.code != 'room_taken':
+                raise
+        rooms = [room for room in rooms if room.id != appointment.room_id]
+
+    booked = room_bookings(rooms, [appointment.date], exclude_id=appointment.id)
+    room = best_fit(rooms, booked, appointment.date, slot_mask(appointment.date, appointment.time, appointment.duration))
+    if room is None:
+        raise ValidationError("No suitable room is free at that time.", code='no_room')
+    appointment.room = room
+    validate_slot(appointment.specialist, appointment.date, appointment.time, appointment.duration,
+                  exclude_id=appointment.id, room=appointment.room)
+
+
+def book(appointment):
+    """
+    Validate and save ``appointment`` atomically under its specialist's day lock.
+
+    Raises ``ValidationError`` when the slot is outside the specialist's hours
+    or already taken, so of any number of concurrent requests for one slot
+    exactly one is saved. Specialists with a ``room_type`` also get a room,
+    claimed under the room-day locks; with none free the booking is refused.
+    Use this instead of ``appointment.save()`` whenever the date, time,
+    duration or specialist may have changed.
+    """
+    from .models import Appointment
+
+    try:
+        with transaction.atomic():
+            lock_specialist_day(appointment.specialist_id, appointment.date)
+            # Lapsed holds no longer block the slot, but still count for the database
+            # constraints until they are marked EXPIRED
+            expire_holds(Appointment.objects.filter(specialist_id=appointment.specialist_id, date=appointment.date))
+            # Re-check under the lock: form validation ran before it was taken
+            if appointment.specialist.room_type:
+                _claim_room(appointment)
+            else:
+                validate_slot(appointment.specialist, appointment.date, appointment.time, appointment.duration,
+                              exclude_id=appointment.id, room=appointment.room)
+            appointment.save()
+    except IntegrityError:
+        # Database constraints are the last line of defence (e.g. writes that bypass book())
+        raise ValidationError("This time slot is already booked.")
+    return appointment
+
+
+def hold_deadline(seconds=None):
+    """When a hold on an unpaid booking taken now lapses (after ``APPOINTMENT_HOLD_SECONDS`` by default)."""
+    return timezone.now() + timedelta(seconds=settings.APPOINTMENT_HOLD_SECONDS if seconds is None else seconds)
+
+
+def refresh_hold(appointment):
+    """
+    Give a live hold at least a full ``APPOINTMENT_HOLD_SECONDS`` again, e.g. when its payment starts.
+
+    The other live holds of its series are renewed with it, so later sessions
+    do not lapse while the client pays the first. Returns ``False`` (and
+    changes nothing) if the hold has already lapsed.
+    """
+    from .models import Appointment
+
+    deadline = hold_deadline()
+    refreshed = Appointment.objects.filter(
+        id=appointment.id, status='PENDING', hold_expires_at__gt=timezone.now(),
+    ).update(hold_expires_at=Greatest('hold_expires_at', Value(deadline)))  # Never shortens a series hold
+    if not refreshed:
+        return False
+    appointment.hold_expires_at = max(appointment.hold_expires_at or deadline, deadline)
+    if appointment.series_id:
+        refresh_series_holds(appointment.series_id)
+    return True
+
+
+def refresh_series_holds(series_id, seconds=None):
+    """
+    Extend the live holds of a series' unpaid sessions to ``seconds`` from now (``APPOINTMENT_HOLD_SECONDS`` by default).
+
+    Holds that already run longer are left alone. Returns the number extended.
+    """
+    from .models import Appointment
+
+    deadline = hold_deadline(seconds)
+    return Appointment.objects.filter(
+        series_id=series_id, status='PENDING', hold_expires_at__gt=timezone.now(), hold_expires_at__lt=deadline,
+    ).update(hold_expires_at=deadline)
+
+
+def expire_holds(queryset=None, batch_size=1000, now=None):
+    """
+    Mark lapsed holds in ``queryset`` (default: all appointments) EXPIRED, in batches.
+
+    Bulk updates skip the post_save signal, so the cached availability of each
+    affected specialist-day is dropped here. Returns the number expired.
+    """
+    from .availability import invalidate_days
+    from .models import Appointment
+
+    lapsed = (queryset if queryset is not None else Appointment.objects.all()).lapsed_holds(now)
+    expired = 0
+    while True:
+        batch = list(lapsed.order_by('hold_expires_at').values_list('id', 'specialist_id', 'date', 'time')[:batch_size])
+        if not batch:
+            return expired
+        # Re-check the status so a hold paid for in the meantime is left alone
+        expired += Appointment.objects.filter(id__in=[row[0] for row in batch], status='PENDING').update(status='EXPIRED')
+        invalidate_days({(specialist_id, date) for _, specialist_id, date, _ in batch})
+        publish_appointment_events(  # Bulk updates skip post_save
+            {'type': 'expired', 'id': pk, 'specialist': specialist_id, 'date': date.isoformat(),
+             'time': time.strftime('%H:%M'), 'status': 'EXPIRED'}
+            for pk, specialist_id, date, time in batch
+        )
+        if len(batch) < batch_size:
+            return expired
+
+
+def _check_occurrences(specialist, dates, time, duration):
+    from .models import Appointment
+
+    booked = defaultdict(int)
+    rows = Appointment.objects.occupying().filter(specialist=specialist, date__in=dates).values_list('date', 'time', 'end_time')
+    for date, start, end in rows:
+        booked[date] |= range_mask(start, end)
+
+    schedule = schedule_for(specialist)
+    rooms = allocate_rooms(specialist, dates, time, duration) if specialist.room_type else {}
+    report = {}
+    for date in dates:
+        working = schedule.mask(date)
+        wanted = slot_mask(date, time, duration)
+        if wanted is None or wanted & ~working:
+            report[date] = outside_hours(specialist, date, working)
+        elif wanted & booked[date]:
+            report[date] = "This time slot is already booked."
+        elif specialist.room_type and rooms[date] is None:
+            report[date] = "No suitable room is free at that time."
+        else:
+            report[date] = None
+    return report, rooms
+
+
+def check_occurrences(specialist, dates, time, duration):
+    """
+    Return ``{date: reason}`` for each of ``dates`` where the slot cannot be booked (``None`` if free).
+
+    One query fetches every occupied interval on those dates; each date is then
+    checked with bit operations against its working-hours and booked bitmaps,
+    instead of one ``validate_slot()`` round trip per date. For specialists who
+    need a room, one more query checks that a room is free on each date.
+    """
+    return _check_occurrences(specialist, dates, time, duration)[0]
+
+
+def book_series(series, status='PENDING'):
+    """
+    Save ``series`` and book every free occurrence, all under the occurrences' day locks.
+
+    Returns ``(appointments, conflicts)`` with ``conflicts`` as ``{date: reason}``
+    for the skipped dates. Raises ``ValidationError`` (and saves nothing) if no
+    occurrence is free. PENDING occurrences are held like single bookings;
+    starting to pay for any session renews the holds of all of them, and
+    paying one holds the rest for ``SERIES_HOLD_SECONDS``.
+    """
+    from .availability import invalidate_days
+    from .models import Appointment
+
+    dates = series.dates()
+    end_time = appointment_window(series.start_date, series.time, series.duration)[1].time()
+    with transaction.atomic():
+        lock_specialist_days(series.specialist_id, dates)
+        expire_holds(Appointment.objects.filter(specialist_id=series.specialist_id, date__in=dates))
+
+        report, rooms = _check_occurrences(series.specialist, dates, series.time, series.duration)
+        claims = {(rooms[date].id, date) for date in dates if report[date] is None and rooms.get(date)}
+        if claims:
+            lock_room_days({room_id for room_id, _ in claims}, {date for _, date in claims})
+            expire_holds(Appointment.objects.filter(room_id__in={room_id for room_id, _ in claims}, date__in=dates))
+            # A room taken between allocation and lock costs that one occurrence rather than the series
+            taken = Appointment.objects.occupying().filter(
+                room_id__in={room_id for room_id, _ in claims}, date__in={date for _, date in claims},
+                time__lt=end_time, end_time__gt=series.time,
+            ).values_list('room_id', 'date')
+            for room_id, date in set(taken) & claims:
+                report[date] = "No suitable room is free at that time."
+        free = [date for date in dates if report[date] is None]
+        if not free:
+            raise ValidationError("None of the sessions in this series are available.")
+
+        series.save()
+        hold_expires_at = hold_deadline() if status == 'PENDING' else None
+        appointments = Appointment.objects.bulk_create([
+            Appointment(user_id=series.user_id, specialist_id=series.specialist_id, series=series, date=date,
+                        time=series.time, duration=series.duration, end_time=end_time, status=status,
+                        hold_expires_at=hold_expires_at, room=rooms.get(date))
+            for date in free
+        ])
+        invalidate_days((series.specialist_id, date) for date in free)  # bulk_create skips post_save
+        publish_appointment_events(appointment_event('created', appointment) for appointment in appointments)
+
+    return appointments, {date: reason for date, reason in report.items() if reason}
@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_data_versions
+from .models import Appointment, Specialist
+
+SEED_PASSWORD = 'studio89-seed'
+
+
+def seed(specialists, users, appointments, batch_size=5000, start_date=None, stdout=None):
+    """
+    Bulk-insert ``specialists``, ``users`` and ``appointments`` synthetic rows.
+
+    Appointments are hourly, non-overlapping slots between 09:00 and 17:00,
+    spread over as many days (from ``start_date``, default today) as needed.
+    Returns the created specialists and users.
+    """
+    User = get_user_model()
+    rng = random.Random(89)
+    start_date = start_date or timezone.localdate()
+    password = make_password(SEED_PASSWORD)  # Hash once; PBKDF2 per row would dominate seeding
+    run = datetime.now().strftime('%Y%m%d%H%M%S')
+    specialties = [value for value, _ in Specialist.SPECIALTY_CHOICES]
+
+    with transaction.atomic():
+        user_rows = User.objects.bulk_create(
+            [User(username=f"seed{run}_{i}", email=f"seed{run}_{i}@example.com", password=password) for i in range(users)],
+            batch_size=batch_size,
+        )
+        specialist_rows = Specialist.objects.bulk_create(
+            [
+                Specialist(
+                    user=user_rows[i % len(user_rows)],
+                    name=f"Specialist {i}",
+                    specialty=specialties[i % len(specialties)],
+                    email=f"specialist{run}_{i}@example.com",
+                    availability_start=time(9),
+                    availability_end=time(17),
+                )
+                for i in range(specialists)
+            ],
+            batch_size=batch_size,
+        )
+
+    slots_per_day = 8
+    batch = []
+    created = 0
+    for index in range(appointments):
+        day, slot = divmod(index // len(specialist_rows), slots_per_day)
+        start = time(9 + slot)
+        batch.append(Appointment(
+            user=rng.choice(user_rows),
+            specialist=specialist_rows[index % len(specialist_rows)],
+            date=start_date + timedelta(days=day),
+            time=start,
+            duration=timedelta(hours=1),
+            end_time=time(10 + slot),  # bulk_create skips save(), so set the derived column here
+            status=rng.choice(['PENDING', 'CONFIRMED']),
+        ))
+        if len(batch) >= batch_size:
+            Appointment.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+            if stdout:
+                stdout.write(f"  {created} appointments")
+    if batch:
+        Appointment.objects.bulk_create(batch)
+    bump_data_versions('specialists', 'appointments')  # bulk_create skips the receivers that would
+
+    return specialist_rows, user_rows
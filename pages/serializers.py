@@ -0,0 +1,63 @@
+from rest_framework import serializers
+
+from .models import Appointment, Specialist
+
+
+def requested_fields(request):
+    """The names in ``?fields=a,b``, or ``None`` when the client wants every field."""
+    value = request.query_params.get('fields') if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that honours ``?fields=`` and knows which joins its fields need.
+
+    ``Meta.select_related`` maps a field name to the relation it reads, so
+    ``prepare_queryset()`` only joins the tables the response will use.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request):
+        """Apply the joins the requested fields need; an unknown field name is a 400."""
+        available = set(cls.Meta.fields)
+        wanted = requested_fields(request)
+        if wanted is None:
+            wanted = available
+        elif wanted - available:
+            raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(sorted(wanted - available))}."]})
+        joins = {relation for name, relation in getattr(cls.Meta, 'select_related', {}).items() if name in wanted}
+        return queryset.select_related(*sorted(joins)) if joins else queryset
+
+
+class SpecialistSerializer(SparseFieldsetSerializer):
+    specialty_display = serializers.CharField(source='get_specialty_display', read_only=True)
+
+    class Meta:
+        model = Specialist
+        fields = ['id', 'name', 'specialty', 'specialty_display', 'availability_start', 'availability_end',
+                  'session_price', 'room_type', 'is_active']
+
+
+class AppointmentSerializer(SparseFieldsetSerializer):
+    specialist_name = serializers.CharField(source='specialist.name', read_only=True)
+    client = serializers.CharField(source='user.username', read_only=True)
+    duration_minutes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Appointment
+        fields = ['id', 'date', 'time', 'end_time', 'duration_minutes', 'status',
+                  'specialist', 'specialist_name', 'client', 'room', 'series']
+        select_related = {'specialist_name': 'specialist', 'client': 'user'}
+
+    def get_duration_minutes(self, appointment):
+        return int(appointment.duration.total_seconds() // 60)
@@ -0,0 +1,95 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Appointment, CustomUser, Specialist
+from .scheduling import book
+
+
+class ListingQueryCountTests(TestCase):
+    """The appointment lists run the same number of queries for one appointment as for many."""
+
+    MANY = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user(username='client', email='client@example.com')
+        cls.staff_user = CustomUser.objects.create_user(username='staff', email='staff@example.com', is_staff=True)
+        # The staff dashboard lists the appointments of the staff member's specialty
+        profile = cls.staff_user.create_profile()
+        profile.specialty = 'barber'
+        profile.save()
+        cls.specialist = Specialist.objects.create(
+            user=cls.staff_user, name='Sam', specialty='barber', email='sam@example.com',
+            availability_start=time(9), availability_end=time(17),
+        )
+
+    def book(self, count):
+        """Replace the appointments with ``count`` upcoming ones for ``client_user`` with ``specialist``."""
+        Appointment.objects.all().delete()
+        first_day = timezone.localdate() + timedelta(days=1)
+        Appointment.objects.bulk_create([
+            Appointment(user=self.client_user, specialist=self.specialist, date=first_day + timedelta(days=i // 8),
+                        time=time(9 + i % 8), end_time=time(10 + i % 8), duration=timedelta(hours=1),
+                        status='CONFIRMED')
+            for i in range(count)
+        ])
+
+    def assertFixedQueries(self, user, url, queries, listed):
+        self.client.force_login(user)
+        for count in (1, self.MANY):
+            self.book(count)
+            with self.subTest(appointments=count), self.assertNumQueries(queries):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context[listed]), count)
+
+    def test_client_dashboard(self):
+        self.assertFixedQueries(self.client_user, reverse('Dashboard'), 3, 'client_appointments')
+
+    def test_staff_dashboard(self):
+        self.assertFixedQueries(self.staff_user, reverse('Dashboard'), 6, 'specialist_appointments')
+
+    def test_view_appointments(self):
+        url = reverse('view_appointments', args=[self.specialist.id])
+        self.assertFixedQueries(self.client_user, url, 4, 'appointments')
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel ``book()`` calls for one slot, each on its own connection: exactly one may win."""
+
+    ATTEMPTS = 16
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("An in-memory SQLite database cannot be shared between threads.")
+        self.user = CustomUser.objects.create_user(username='client', email='client@example.com')
+        self.specialist = Specialist.objects.create(
+            user=self.user, name='Sam', specialty='barber', email='sam@example.com',
+            availability_start=time(9), availability_end=time(17),
+        )
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def attempt(self, start):
+        try:
+            book(Appointment(user=self.user, specialist=self.specialist, date=self.date, time=start,
+                             duration=timedelta(hours=1), status='PENDING'))
+            return 'booked'
+        except ValidationError:
+            return 'rejected'
+        finally:
+            connection.close()  # Each worker thread has its own connection
+
+    def test_one_booking_wins(self):
+        # Staggered starts inside one hour all overlap, so only the day lock can keep out the losers
+        starts = [time(10, (i % 12) * 5) for i in range(self.ATTEMPTS)]
+        with ThreadPoolExecutor(max_workers=self.ATTEMPTS) as pool:
+            outcomes = Counter(pool.map(self.attempt, starts))
+        self.assertEqual(outcomes, {'booked': 1, 'rejected': self.ATTEMPTS - 1})
+        self.assertEqual(Appointment.objects.filter(specialist=self.specialist, date=self.date).count(), 1)
@@ -1,19 +1,27 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
+from rest_framework.routers import DefaultRouter
+from .api import AppointmentViewSet, AvailabilityViewSet, SpecialistViewSet
+from .outlets import OUTLETS
 from .views import (Home, AboutUs, contactus, 
                     signup, custom_login_view, 
                     check_user_exists, check_user_exists_password, 
-                    Tatooist, Barber, Therapist,
-                    Hairdresser, Nailtech,
-                    DogGroomer, Physiotherapist,
-                    Chiropractor, Booking, Dashboard, 
+                    outlet_page, Booking, Dashboard, 
                     Payment, appointment_success,
                     PaymentFailed, AddSpecialist, 
                     get_user_data, cancel_appointment,
                     view_appointments, amend_appointment, 
                     password_reset_request, password_reset_verify, 
-                    password_reset_confirm)
+                    password_reset_confirm, specialist_availability,
+                    stripe_webhook, export_data, BookingSeries,
+                    appointment_events)
+
+# Read-only JSON API for the mobile client
+router = DefaultRouter()
+router.register('specialists', SpecialistViewSet, basename='api-specialist')
+router.register('appointments', AppointmentViewSet, basename='api-appointment')
+router.register('availability', AvailabilityViewSet, basename='api-availability')
 
 urlpatterns = [
     # Home and Static Pages
@@ -21,15 +29,8 @@ urlpatterns = [
     path('AboutUs', AboutUs, name='About'),
     path('ContactUs', contactus, name='Contact'),
     
-    # Specialist Pages
-    path('Tatooist', Tatooist, name="Tatoo"),
-    path("Barber", Barber , name="Barber"),
-    path("Therapist", Therapist, name="Therapist"),
-    path("Hairdresser",Hairdresser, name="Hairdresser"),
-    path("NailTech",Nailtech, name="NailTech"),
-    path("DogGroomer",DogGroomer, name="DogGroomer"),
-    path("Chiropractor",Chiropractor, name="Chiropractor"),
-    path("Physiotherapist",Physiotherapist, name="Physiotherapist"),
+    # Specialist Pages (one route per entry in the outlet registry)
+    *[path(outlet.path, outlet_page, {'outlet': outlet.slug}, name=outlet.url_name) for outlet in OUTLETS.values()],
     
     # Authentication Routes
     path('signup/', signup, name='signup'),
@@ -38,7 +39,10 @@ urlpatterns = [
     
     # Booking and Dashboard
     path("Booking", Booking, name="Booking"),
+    path("Booking/availability/", specialist_availability, name="specialist_availability"),
+    path("Booking/series/", BookingSeries, name="BookingSeries"),
     path("Dashboard", Dashboard, name="Dashboard"),
+    path("Dashboard/events/", appointment_events, name="appointment_events"),
     
     # Specialist Management
     path('add-specialist/', AddSpecialist, name='add_specialist'),
@@ -47,14 +51,22 @@ urlpatterns = [
     path("Payment/<int:booking_id>/", Payment, name="Payment"),
     path("Payment/success", appointment_success, name="Success"),
     path("Payment/Failed/<int:appointment_id>/", PaymentFailed, name="Failed"),
+    path("Payment/webhook/", stripe_webhook, name="stripe_webhook"),
     
     # Appointment Management Routes
     path('cancel_appointment/<int:appointment_id>/', cancel_appointment, name='cancel_appointment'),
     
     # View and Amend Appointments
     path('specialist/<int:specialist_id>/appointments/', view_appointments, name='view_appointments'),
+    path('specialist/<int:specialist_id>/appointments.json', view_appointments, {'as_json': True}, name='view_appointments_json'),
     path('appointment/<int:appointment_id>/amend/', amend_appointment, name='amend_appointment'),
     
+    # REST API, e.g. api/appointments/?fields=id,date,time
+    path('api/', include(router.urls)),
+
+    # Staff data exports, e.g. export/appointments.csv or export/users.jsonl
+    path('export/<str:dataset>.<str:fmt>', export_data, name='export_data'),
+
     # User Validation Routes
     path('get_user_data/<int:user_id>/', get_user_data, name='get_user_data'),
     path('check_user_exists/', check_user_exists, name='check_user_exists'),
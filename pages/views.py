@@ -7,32 +7,34 @@ from django.http import JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from datetime import datetime
-from django.core.mail import send_mail, get_connection
 from django.utils.html import strip_tags
-import requests
 from django.contrib.auth import get_user_model
-from Studio89.settings import DEFAULT_FROM_EMAIL, MAILGUN_API_KEY, EMAIL_BACKEND, MAILGUN_DOMAIN_NAME
+from Studio89.settings import DEFAULT_FROM_EMAIL
 from django.http import HttpResponseForbidden
-
-connection = get_connection(
-    EMAIL_BACKEND,
-    api_key=MAILGUN_API_KEY,
-    domain=MAILGUN_DOMAIN_NAME,
-    fail_silently=False
-)
+from .emails import queue_email
+from .caching import cache_public_page
+from .outlets import OUTLETS, outlet_specialists
+from .authentication import user_exists
+from .ratelimit import ratelimit
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
 
 def get_client_ip(request):
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    # The leftmost X-Forwarded-For entries are whatever the client sent; only the ones appended by
+    # our own TRUSTED_PROXY_COUNT proxies, counted from the right, can be relied on
+    if settings.TRUSTED_PROXY_COUNT:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= settings.TRUSTED_PROXY_COUNT:
+            return forwarded[-settings.TRUSTED_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR')
 
 
+@cache_public_page
 def Home(request):
     return render (request, 'home/index.html')
 
+@cache_public_page
 def AboutUs(request):
     return render (request, 'home/about.html')
 
@@ -53,13 +55,11 @@ def contactus(request):
             email_context = {'name': name}
             email_template = render_to_string('contact/contact.html', email_context)
 
-            # Send email
-            send_mail(
+            # Queue email for the outbox worker
+            queue_email(
                 subject,
                 message,
-                DEFAULT_FROM_EMAIL,
                 ['robertfall98@gmail.com'],
-                connection=connection,
                 html_message=email_template
             )
 
@@ -94,35 +94,21 @@ def signup(request):
 
             login(request, user)  # Log in the user
 
-            # Debugging: Check if the email exists
-            print(f"User email: {user.email}")  # Should print the actual email
+            logger.info("New account %s signed up", user.pk)
 
             # Email setup
             context = {'user': user}
             email_html = render_to_string('accounts/account_confirmation.html', context)
             email_plain = strip_tags(email_html)
 
-            # Mailgun API setup
-            mailgun_url = f"https://api.mailgun.net/v4/{MAILGUN_DOMAIN_NAME}/messages"
-            mailgun_auth = ("api", MAILGUN_API_KEY)
-            mailgun_data = {
-                "from": DEFAULT_FROM_EMAIL,
-                "to": user.email,
-                "subject": "Welcome to Studio 89!",
-                "text": email_plain,
-                "html": email_html
-            }
-
-            # Send email via Mailgun API
-            try:
-                response = requests.post(mailgun_url, auth=mailgun_auth, data=mailgun_data, verify=False)
-                
-                if response.status_code == 200:
-                    messages.success(request, "Account created successfully! Please check your email for confirmation.")
-                else:
-                    messages.warning(request, "Account created, but there was an issue sending the confirmation email.")
-            except requests.exceptions.RequestException as e:
-                messages.warning(request, f"Your account was created, but we couldn't send a confirmation email: {str(e)}")
+            # Welcome email goes through the outbox so signup never waits on Mailgun
+            queue_email(
+                "Welcome to Studio 89!",
+                email_plain,
+                [user.email],
+                html_message=email_html
+            )
+            messages.success(request, "Account created successfully! Please check your email for confirmation.")
 
             return redirect('Home')  # Always redirect to Home after form submission
 
@@ -140,24 +126,11 @@ def signup(request):
 # Custom Login View
 def custom_login_view(request):
     if request.method == 'POST':
-        form = CustomLoginForm(request.POST)
+        form = CustomLoginForm(request.POST, request=request)
         if form.is_valid():
-            username_or_email = form.cleaned_data['username']
-            password = form.cleaned_data['password']
-            CustomUser = get_user_model()
-
-            try:
-                user = CustomUser.objects.get(email=username_or_email) if '@' in username_or_email else CustomUser.objects.get(username=username_or_email)
-            except CustomUser.DoesNotExist:
-                form.add_error('username', 'User not found.')
-                return render(request, 'login.html', {'form': form})
-
-            if user.check_password(password):
-                user.backend = 'django.contrib.auth.backends.ModelBackend'
-                login(request, user)
-                return redirect('Dashboard')
-            else:
-                form.add_error(None, 'Invalid password.')
+            # The form already authenticated the user; no second lookup or hash here
+            login(request, form.get_user())
+            return redirect('Dashboard')
 
     else:
         form = CustomLoginForm()
@@ -169,12 +142,15 @@ def logout_view(request):
     messages.success(request, "You have been logged out.")
     return render(request, 'accounts/logout.html')
 
+@ratelimit('user_exists', 'USER_PROBE', identifier_param='username_or_email')
 def check_user_exists(request):
     username_or_email = request.GET.get('username_or_email')
-    exists = CustomUser.objects.filter(email=username_or_email).exists() if '@' in username_or_email else CustomUser.objects.filter(username=username_or_email).exists()
-    return JsonResponse({'exists': exists})
+    if not username_or_email:
+        return JsonResponse({'exists': False})
+    return JsonResponse({'exists': user_exists(username_or_email)})
 
 # Check if User Exists with Password (AJAX)
+@ratelimit('user_password', 'PASSWORD_PROBE', identifier_param='username_or_email')
 def check_user_exists_password(request):
     username_or_email = request.GET.get('username_or_email')
     password = request.GET.get('password')
@@ -182,52 +158,34 @@ def check_user_exists_password(request):
     if not username_or_email or not password:
         return JsonResponse({"valid": False, "error_type": "missing_fields"})
 
-    CustomUser = get_user_model()
-
-    try:
-        user = CustomUser.objects.get(email=username_or_email) if '@' in username_or_email else CustomUser.objects.get(username=username_or_email)
-    except CustomUser.DoesNotExist:
+    if not user_exists(username_or_email):
         return JsonResponse({"valid": False, "error_type": "user_not_found"})
 
-    user = authenticate(request, username=user.username, password=password)
-
-    return JsonResponse({"valid": True} if user else {"valid": False, "error_type": "invalid_password"})
-
-def Tatooist(request):
-    return render(request, 'outlets/Tatooist.html')
-
-def Barber(request):
-    return render(request, 'outlets/barber.html')
+    # Repeating the same credentials within the debounce window reuses the last answer instead of re-hashing
+    debounce_key = "password_probe:" + salted_hmac('pages.check_user_exists_password', f"{username_or_email}\0{password}").hexdigest()
+    result = cache.get(debounce_key)
+    if result is None:
+        user = authenticate(request, username=username_or_email, password=password)
+        result = {"valid": True} if user else {"valid": False, "error_type": "invalid_password"}
+        cache.set(debounce_key, result, settings.PASSWORD_PROBE_DEBOUNCE_SECONDS)
 
-def Therapist(request):
-    return render(request, 'outlets/therapist.html')
+    return JsonResponse(result)
 
-def Hairdresser(request):
-    return render(request, 'outlets/hairdresser.html')
-
-def Nailtech(request):
-    return render(request, 'outlets/nailtech.html')
-
-def DogGroomer(request):
-    return render(request, 'outlets/doggroomer.html')
-
-def Physiotherapist(request):
-    return render(request, 'outlets/physiotherapist.html')
-
-def Chiropractor(request):
-    return render(request, 'outlets/chiropractor.html')
+@cache_public_page(timeout_setting='OUTLET_PAGE_CACHE_TIMEOUT')
+def outlet_page(request, outlet):
+    """One view for every outlet page in the ``OUTLETS`` registry."""
+    outlet = OUTLETS[outlet]
+    return render(request, outlet.template, {'outlet': outlet, 'specialists': outlet_specialists(outlet)})
 
 def send_appointment_email(user, subject, context, template_html, template_plain):
+    """Render the notification now and queue it; delivery happens in `send_queued_email`."""
     email_html = render_to_string(template_html, context)
     email_plain = strip_tags(email_html)
-    from_email = DEFAULT_FROM_EMAIL
 
-    send_mail(
+    queue_email(
         subject,
         email_plain,  # Plain-text email content
-        DEFAULT_FROM_EMAIL,
         [user.email],  # Send to the correct user
-        connection=connection,
         html_message=email_html
     )
 
@@ -236,13 +194,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from .models import Specialist, Appointment
-from .forms import AppointmentForm
+from .forms import AppointmentForm, AppointmentSeriesForm
+from .scheduling import book, book_series, hold_deadline, refresh_hold
 from datetime import datetime, time
 
 import stripe
 from django.conf import settings
-
-stripe.api_key = your_stripe_secret_key = settings.STRIPE_SECRET_KEY
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.http import HttpResponse
+from .payments import get_or_create_payment, handle_stripe_event
 
 import logging
 
@@ -260,9 +221,11 @@ def Booking(request):
             appointment = form.save(commit=False)
             appointment.user = request.user  # Assign logged-in user
             appointment.status = 'PENDING'  # Default status
+            # Unpaid bookings only hold the slot for a while; see `expire_holds`
+            appointment.hold_expires_at = hold_deadline()
 
             try:
-                appointment.save()  # Triggers `clean()`
+                book(appointment)  # Re-checks the slot under the specialist's day lock
                 return redirect('Payment', booking_id=appointment.id)
             except ValidationError as e:
                 form.add_error(None, e.messages[0])  # Show validation errors in form
@@ -275,50 +238,78 @@ def Booking(request):
     return render(request, 'appointments/book_appointment.html', {'form': form})
 
 
+@login_required
+def BookingSeries(request):
+    """Book a weekly or fortnightly series; clashing dates are listed per session."""
+    if request.method == 'POST':
+        form = AppointmentSeriesForm(request.POST)
+        if form.is_valid():
+            series = form.save(commit=False)
+            series.user = request.user
+            try:
+                # Re-checked under the day locks: a date may have been taken since the form was validated
+                appointments, conflicts = book_series(series)
+            except ValidationError as e:
+                form.add_error(None, e.messages[0])
+            else:
+                message = (f"Booked {len(appointments)} sessions with {series.specialist.name}. Unpaid sessions "
+                           f"are released after {settings.APPOINTMENT_HOLD_SECONDS // 60} minutes; once you pay for "
+                           f"one, the rest are held for {settings.SERIES_HOLD_SECONDS // 3600} hours.")
+                if conflicts:
+                    skipped = ", ".join(date.strftime('%d %b %Y') for date in sorted(conflicts))
+                    message += f" Skipped unavailable dates: {skipped}."
+                messages.success(request, message)
+                return redirect('Payment', booking_id=appointments[0].id)
+    else:
+        form = AppointmentSeriesForm()
+
+    return render(request, 'appointments/book_series.html', {'form': form, 'report': form.report})
+
+
 import logging
 
 logger = logging.getLogger(__name__)
 
 @login_required
 def Payment(request, booking_id):
-    appointment = get_object_or_404(Appointment, id=booking_id, user=request.user)
-    amount_in_pence = int(appointment.total_price * 100)  # Calculate amount in pence
-    logger.debug(f"Appointment total price: {appointment.total_price}")  # Debugging line
-    if request.method == 'POST':
-        try:
-            charge = stripe.Charge.create(
-                amount=amount_in_pence,  # Use the calculated amount in pence
-                currency="gbp",
-                description=f"Appointment with {appointment.specialist.name} on {appointment.date} at {appointment.time}",
-                source=request.POST['stripeToken']
-            )
-            appointment.payment_status = "PAID"
-            appointment.status = "CONFIRMED"
-            appointment.save()
-            return redirect('appointment_success')
-        except stripe.error.CardError as e:
-            logger.error(f"Card error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except stripe.error.RateLimitError as e:
-            logger.error(f"Rate limit error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except stripe.error.InvalidRequestError as e:
-            logger.error(f"Invalid request error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except stripe.error.AuthenticationError as e:
-            logger.error(f"Authentication error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except stripe.error.APIConnectionError as e:
-            logger.error(f"API connection error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except stripe.error.StripeError as e:
-            logger.error(f"Stripe error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            return redirect('Failed', appointment_id=appointment.id)
-    else:
-        return render(request, 'payments/payment.html', {'appointment': appointment, 'amount_in_pence': amount_in_pence})
+    appointment = get_object_or_404(Appointment.objects.select_related('specialist'), id=booking_id, user=request.user)
+    if appointment.status == 'CONFIRMED':
+        return redirect('Success')
+    if appointment.status == 'CANCELLED':
+        messages.error(request, "This appointment has been cancelled. Please book again.")
+        return redirect('Booking')
+    # Starting to pay gives a live hold (and the rest of its series) its full time again
+    if appointment.status == 'EXPIRED' or (appointment.hold_expires_at and not refresh_hold(appointment)):
+        messages.error(request, "Your hold on this slot has expired. Please book again.")
+        return redirect('Booking')
+
+    try:
+        # Reuses the same PaymentIntent on refresh/double click; the card is charged by Stripe.js
+        payment = get_or_create_payment(appointment)
+    except stripe.error.StripeError as e:
+        logger.error("Could not create PaymentIntent for appointment %s: %s", appointment.id, e)
+        return redirect('Failed', appointment_id=appointment.id)
+
+    return render(request, 'payments/payment.html', {
+        'appointment': appointment,
+        'amount_in_pence': payment.amount,
+        'client_secret': payment.client_secret,
+        'stripe_publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
+    })
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Stripe calls this to report PaymentIntent outcomes; it confirms the appointment."""
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body, request.META.get('HTTP_STRIPE_SIGNATURE', ''), settings.STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        logger.warning("Rejected Stripe webhook: %s", e)
+        return HttpResponse(status=400)
+
+    handle_stripe_event(event)
+    return HttpResponse(status=200)
 
 @login_required
 def appointment_success(request):
@@ -329,41 +320,56 @@ def PaymentFailed(request, appointment_id):
     appointment = get_object_or_404(Appointment, id=appointment_id, user=request.user)
     return render(request, 'payments/paymentfailed.html', {'appointment': appointment})
 
+from .pagination import keyset_paginate
+
+def paginate_appointments(request, queryset):
+    """
+    Apply the listing window and keyset cursors from the query string.
+
+    Upcoming appointments only unless ``?history=1``; ``?after=``/``?before=``
+    hold the cursors. Raises ``ValueError`` for a malformed cursor.
+    """
+    if not request.GET.get('history'):
+        queryset = queryset.filter(date__gte=timezone.localdate())
+    return keyset_paginate(
+        queryset,
+        settings.APPOINTMENTS_PAGE_SIZE,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
 @login_required
 def Dashboard(request):
+    # Every list below is a single joined query, however many appointments it holds
+    client_appointments = Appointment.objects.filter(user=request.user).for_listing()
+
     if request.user.is_staff:
         # Fetch all specialists for staff members
-        specialists = Specialist.objects.all()
+        specialists = Specialist.objects.only('id', 'name', 'specialty', 'availability_start', 'availability_end')
 
         # Assuming the user has a profile with a 'specialty' field
         user_specialty = request.user.profile.specialty  # Adjust based on your model
 
-        # Define the specialties to filter on
-        specialties = [
-            'Beauticians', 'hairdresser', 'tattoo_artist', 'nail_technician',
-            'dog_groomer', 'aesthetic_practitioner', 'sports_therapist', 
-            'physiotherapist', 'chiropractor', 'semi_permanent_makeup'
-        ]
-
         # If the user is a specialist, show appointments for that specialty
-        if user_specialty in specialties:
-            appointments = Appointment.objects.filter(specialist__specialty=user_specialty)
-            client_appointments = Appointment.objects.filter(user=request.user)
+        if user_specialty in dict(Specialist.SPECIALTY_CHOICES):
+            specialist_appointments = Appointment.objects.filter(specialist__specialty=user_specialty).for_listing()
         else:
             # If user is staff but not a specialist, show all appointments for this staff member
-            appointments = Appointment.objects.filter(specialist__user=request.user)
-            client_appointments = Appointment.objects.filter(user=request.user)
-        
-            return render(request, 'appointments/staff_dashboard.html', {
+            specialist_appointments = Appointment.objects.filter(specialist__user=request.user).for_listing()
+
+        try:
+            page = paginate_appointments(request, specialist_appointments)
+        except ValueError:
+            return redirect('Dashboard')
+
+        return render(request, 'appointments/staff_dashboard.html', {
             'specialists': specialists,
-            'appointments': appointments,
+            'specialist_appointments': page.items,
+            'page': page,
             'client_appointments': client_appointments})
 
     else:
         # For regular users (clients), show their own appointments
-        client_appointments = Appointment.objects.filter(user=request.user)
-
-        # Render the user dashboard with the client appointments
         return render(request, 'appointments/user_dashboard.html', {'client_appointments': client_appointments})
 
 @login_required
@@ -413,12 +419,57 @@ def get_user_data(request, user_id):
     
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils import timezone
+from .availability import availability_payload, parse_availability_query
+
 @login_required
-def view_appointments(request, specialist_id):
+def view_appointments(request, specialist_id, as_json=False):
     specialist = get_object_or_404(Specialist, id=specialist_id)
-    appointments = Appointment.objects.filter(specialist=specialist)
+    appointments = Appointment.objects.filter(specialist=specialist).for_listing()
 
-    return render(request, 'appointments/specialist_appointments.html', {'specialist': specialist, 'appointments': appointments})
+    try:
+        page = paginate_appointments(request, appointments)
+    except ValueError:
+        if as_json:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return redirect('view_appointments', specialist_id=specialist.id)
+
+    if as_json:
+        return JsonResponse({
+            'specialist': {'id': specialist.id, 'name': specialist.name},
+            'appointments': [
+                {
+                    'id': appointment.id,
+                    'client': appointment.user.username,
+                    'date': appointment.date.isoformat(),
+                    'time': appointment.time.strftime('%H:%M'),
+                    'duration_minutes': int(appointment.duration.total_seconds() // 60),
+                    'status': appointment.status,
+                }
+                for appointment in page.items
+            ],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    return render(request, 'appointments/specialist_appointments.html', {'specialist': specialist, 'appointments': page.items, 'page': page})
+
+def specialist_availability(request):
+    """
+    JSON free slots for one or more specialists over a date range.
+
+    Query params: ``specialist`` (repeatable or comma separated ids),
+    ``start``/``end`` (YYYY-MM-DD, defaults to the next 7 days) and an
+    optional ``duration`` in minutes to hide gaps that are too short.
+    """
+    try:
+        specialist_ids, start_date, end_date, min_duration = parse_availability_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    specialists = list(Specialist.objects.filter(id__in=specialist_ids, is_active=True).only(
+        'id', 'name', 'availability_start', 'availability_end', 'room_type'))
+    return JsonResponse(availability_payload(specialists, start_date, end_date, min_duration))
 
 # Amend an appointment's details (time, etc.)
 @login_required
@@ -428,7 +479,11 @@ def amend_appointment(request, appointment_id):
     if request.method == 'POST':
         form = AppointmentForm(request.POST, instance=appointment)  # Load form with submitted data
         if form.is_valid():
-            form.save()  # Save the changes to the database
+            try:
+                book(form.save(commit=False))  # Save the changes under the day lock
+            except ValidationError as e:
+                form.add_error(None, e.messages[0])
+                return render(request, 'appointments/amend_appointment.html', {'form': form, 'appointment': appointment})
 
             # Determine the recipient of the email
             if request.user == appointment.user:
@@ -464,9 +519,10 @@ def amend_appointment(request, appointment_id):
 def cancel_appointment(request, appointment_id):
     appointment = get_object_or_404(Appointment, id=appointment_id)
 
-    # Cancel the appointment
-    appointment.status = "Cancelled"
-    appointment.save()
+    # Cancel the appointment; the slot is free again
+    appointment.status = 'CANCELLED'
+    appointment.hold_expires_at = None
+    appointment.save(update_fields=['status', 'hold_expires_at', 'end_time'])
 
     # Send email notification to the user
     context = {'user': appointment.user, 'appointment': appointment}
@@ -485,7 +541,6 @@ def cancel_appointment(request, appointment_id):
 
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.contrib import messages
@@ -515,13 +570,12 @@ def password_reset_request(request):
             # Ensure the subject is a clean string
             subject = "Password Reset Request"
 
-            send_mail(
+            queue_email(
                 'password reset request',  # Subject
                 email_plain,  # Plain-text version of the email
-                from_email,  # Sender email (must match your Mailgun settings)
                 [user.email],  # Recipient list (must be a list)
                 html_message=email_template,  # HTML version of the email
-                connection=connection
+                from_email=from_email  # Sender email (must match your Mailgun settings)
             )
 
             messages.success(request, "A password reset token has been sent to your email.")
@@ -585,4 +639,54 @@ def password_reset_confirm(request, uidb64, token):
         messages.error(request, "Invalid token or user.")
         return redirect('password_reset_request')
 
-    return render(request, 'accounts/password_reset_confirm.html', {'form': form})
\ No newline at end of file
+    return render(request, 'accounts/password_reset_confirm.html', {'form': form})
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, StreamingHttpResponse
+from .exports import DATASETS, FORMATS
+
+@staff_member_required
+def export_data(request, dataset, fmt):
+    """Stream every row of a dataset as CSV or JSON Lines, in constant memory."""
+    if dataset not in DATASETS or fmt not in FORMATS:
+        raise Http404("Unknown export.")
+    stream, content_type = FORMATS[fmt]
+    response = StreamingHttpResponse(stream(DATASETS[dataset], settings.EXPORT_CHUNK_SIZE), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{dataset}-{timezone.localdate().isoformat()}.{fmt}"'
+    return response
+
+from django.core.handlers.asgi import ASGIRequest
+from .events import ALL_CHANNEL, event_stream, specialist_channel
+
+async def appointment_events(request):
+    """
+    Push appointment changes to the dashboards as Server-Sent Events.
+
+    Staff get every specialist's events, other users those of the specialists
+    they are; ``?specialist=<id>`` narrows the stream to one. Needs the ASGI
+    server: a WSGI worker would be tied up for as long as the stream is open.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden("Log in to receive appointment events.")
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Appointment events need the ASGI server (Studio89.asgi).", status=501)
+
+    specialist_id = request.GET.get('specialist')
+    if specialist_id is not None and not specialist_id.isdigit():
+        return HttpResponse("Invalid specialist.", status=400)
+    own = [pk async for pk in Specialist.objects.filter(user=user).values_list('id', flat=True)]
+    if specialist_id is not None:
+        if not user.is_staff and int(specialist_id) not in own:
+            return HttpResponseForbidden("Not your calendar.")
+        channels = [specialist_channel(specialist_id)]
+    elif user.is_staff:
+        channels = [ALL_CHANNEL]
+    elif own:
+        channels = [specialist_channel(pk) for pk in own]
+    else:
+        return HttpResponseForbidden("Only staff and specialists receive appointment events.")
+
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx holding events back in its buffer
+    return response